@@ -0,0 +1,69 @@
+"""Deserialize scan pages with TypeDeserializer and BulkTypeDeserializer.
+
+Two page shapes: the flat batch records lambda_c scans, and analyzed
+posts with strings, numbers, a nested map and a string set per item.
+Run from the repository root:
+
+    PYTHONPATH=layer/python python benchmarks/bench_dynamodb_deserialize.py
+"""
+import copy
+import timeit
+
+from boto3.dynamodb.types import BulkTypeDeserializer, TypeDeserializer
+
+PAGE_SIZE = 1000
+REPEAT = 20
+
+
+def make_batch_record(i):
+    return {
+        "batch_id": {"S": f"20240101_120000_{i}"},
+        "status": {"S": "done"},
+        "items": {"N": "10"},
+        "updatedAt": {"N": str(1700000000 + i)},
+    }
+
+
+def make_post(i):
+    return {
+        "batch_id": {"S": f"20240101_120000_{i // 10}"},
+        "url": {"S": f"https://www.reddit.com/r/television/comments/{i:06x}/"},
+        "title": {"S": f"Post {i} about the new season"},
+        "source": {"S": "reddit" if i % 3 else "youtube"},
+        "keyword": {"S": "squid game"},
+        "created_utc": {"N": str(1700000000 + i)},
+        "sentiment": {"S": ("Positive", "Negative", "Neutral")[i % 3]},
+        "sentiment_score": {"N": f"{(i % 200 - 100) / 100:.2f}"},
+        "sentiment_source": {"S": "llm"},
+        "statistics": {"M": {"viewCount": {"N": str(i * 17)}, "likeCount": {"N": str(i)}}},
+        "tags": {"SS": ["tv", "netflix"]},
+        "analyzed": {"BOOL": True},
+    }
+
+
+def generic(page):
+    deserializer = TypeDeserializer()
+    return [{k: deserializer.deserialize(v) for k, v in item.items()} for item in page]
+
+
+def bulk(page):
+    return BulkTypeDeserializer().deserialize_items(page)
+
+
+def run(label, make_item):
+    page = [make_item(i) for i in range(PAGE_SIZE)]
+    assert generic(copy.deepcopy(page)) == bulk(copy.deepcopy(page)), "results differ"
+
+    print(f"{label}, {PAGE_SIZE} items per page")
+    results = {}
+    for name, fn in (("TypeDeserializer", generic), ("BulkTypeDeserializer", bulk)):
+        # a new deserializer per page, as in a fresh container, so plan compilation is included
+        seconds = min(timeit.repeat(lambda: fn(page), number=1, repeat=REPEAT))
+        results[name] = seconds
+        print(f"  {name:22s} {seconds * 1000:7.2f} ms")
+    print(f"  speedup: {results['TypeDeserializer'] / results['BulkTypeDeserializer']:.1f}x")
+
+
+if __name__ == "__main__":
+    run("batch records", make_batch_record)
+    run("analyzed posts", make_post)
@@ -0,0 +1,95 @@
+"""Decode a large multi-frame event stream fed in small chunks.
+
+Compares the in-place EventStreamBuffer with the implementation of the
+baseline (root) commit, loaded from git, and checks both decode the same
+messages. Times are the best of REPEAT interleaved runs. Run from the repository root:
+
+    PYTHONPATH=layer/python python benchmarks/bench_eventstream.py
+"""
+import struct
+import subprocess
+import sys
+import time
+import types
+from binascii import crc32
+
+from botocore import eventstream
+
+CHUNK_SIZE = 4096
+REPEAT = 7
+
+
+def encode_header(name, value):
+    name = name.encode("utf-8")
+    value = value.encode("utf-8")
+    # header type 7 is a string with a 2 byte length
+    return struct.pack("!B", len(name)) + name + struct.pack("!BH", 7, len(value)) + value
+
+
+def encode_message(payload, event_type="chunk"):
+    headers = (
+        encode_header(":message-type", "event")
+        + encode_header(":event-type", event_type)
+        + encode_header(":content-type", "application/json")
+    )
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(headers))
+    prelude += struct.pack("!I", crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + headers + payload
+    return message + struct.pack("!I", crc32(message) & 0xFFFFFFFF)
+
+
+def baseline_module():
+    root = subprocess.run(
+        ["git", "rev-list", "--max-parents=0", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.split()[0]
+    source = subprocess.run(
+        ["git", "show", f"{root}:layer/python/botocore/eventstream.py"], capture_output=True, text=True, check=True
+    ).stdout
+    module = types.ModuleType("baseline_eventstream")
+    module.__dict__["__package__"] = "botocore"
+    exec(compile(source, "baseline_eventstream.py", "exec"), module.__dict__)
+    return module
+
+
+def decode(module, stream):
+    buffer = module.EventStreamBuffer()
+    messages = []
+    start = time.perf_counter()
+    for i in range(0, len(stream), CHUNK_SIZE):
+        buffer.add_data(stream[i:i + CHUNK_SIZE])
+        for message in buffer:
+            messages.append((message.headers, bytes(message.payload)))
+    return time.perf_counter() - start, messages
+
+
+def run(label, stream, modules):
+    print(f"{label}: {len(stream) / 1024 / 1024:.1f} MB in {CHUNK_SIZE} byte chunks")
+    results, best = {}, {}
+    # the implementations take turns, so warm-up and allocator state favour neither
+    for _ in range(REPEAT):
+        for name, module in modules:
+            seconds, results[name] = decode(module, stream)
+            best[name] = min(seconds, best.get(name, seconds))
+    for name, _ in modules:
+        print(f"  {name:9s} {best[name] * 1000:9.1f} ms  {len(results[name])} messages")
+    if len(results) == 2:
+        assert results["baseline"] == results["current"], "decoded messages differ"
+        print("  identical output")
+
+
+if __name__ == "__main__":
+    modules = [("current", eventstream)]
+    try:
+        modules.insert(0, ("baseline", baseline_module()))
+    except Exception as e:
+        print(f"baseline not available ({e}), timing the current implementation only", file=sys.stderr)
+
+    # one frame is close to the 16 MB limit, so the buffer waits for it over ~2,000 chunks
+    run("one 8 MB frame", encode_message(b"x" * (8 * 1024 * 1024)), modules)
+    # many small frames, e.g. a streamed model response
+    small = b"".join(encode_message(b'{"bytes": "%06d"}' % i) for i in range(50000))
+    run("50,000 small frames", small, modules)
+    # medium frames that straddle chunk boundaries
+    medium = b"".join(encode_message(bytes([i % 256]) * 10000) for i in range(800))
+    run("800 x 10 KB frames", medium, modules)
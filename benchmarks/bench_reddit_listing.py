@@ -0,0 +1,91 @@
+"""Read a 1,000-post search listing through praw objects and through search_raw.
+
+The listing pages come from a fake praw core, so no network or credentials
+are used. Each post carries about 80 fields, close to what Reddit returns.
+Run from the repository root:
+
+    PYTHONPATH=layer/python python benchmarks/bench_reddit_listing.py
+"""
+import os
+import timeit
+import tracemalloc
+
+# praw refuses to build a client without credentials; the fake core never sends them
+os.environ.setdefault("REDDIT_CLIENT_ID", "benchmark")
+os.environ.setdefault("REDDIT_SECRET", "benchmark")
+
+from backend import reddit_client
+
+POSTS = 1000
+PAGE_SIZE = 100
+REPEAT = 5
+
+
+def make_child(i):
+    return {"kind": "t3", "data": {
+        "title": f"Post {i} about the new season",
+        "score": i,
+        "url": f"https://www.reddit.com/r/television/comments/{i:06x}/",
+        "created_utc": 1700000000.0 + i,
+        "author": f"user{i}",
+        "subreddit": "television",
+        "subreddit_id": "t5_2qh6e",
+        "id": f"{i:06x}",
+        "name": f"t3_{i:06x}",
+        "num_comments": 10,
+        "selftext": "lorem ipsum " * 30,
+        "all_awardings": [],
+        "preview": {"images": [{"source": {"url": "https://i.redd.it/x.jpg", "width": 1, "height": 1}}]},
+        "author_flair_richtext": [],
+        "link_flair_richtext": [],
+        "media": None,
+        "permalink": f"/r/television/comments/{i:06x}/",
+        **{f"field_{k}": k for k in range(60)},
+    }}
+
+
+class FakeRateLimiter:
+    remaining = None
+    reset_timestamp = None
+
+
+class FakeCore:
+    """Answers listing requests with pages of synthetic posts."""
+
+    _rate_limiter = FakeRateLimiter()
+
+    def request(self, method, path, params=None, **kwargs):
+        after = (params or {}).get("after")
+        start = int(after[3:], 16) + 1 if after else 0
+        end = min(start + PAGE_SIZE, POSTS)
+        children = [make_child(i) for i in range(start, end)]
+        return {"kind": "Listing", "data": {"after": f"t3_{end - 1:06x}" if end < POSTS else None, "children": children}}
+
+
+def objectified(reddit):
+    return [
+        {"title": post.title, "score": post.score, "url": post.url, "created_utc": post.created_utc}
+        for post in reddit.subreddit("all").search(query="squid game", sort="hot", limit=POSTS)
+    ]
+
+
+def raw(reddit):
+    return list(reddit_client.search_raw(reddit, "squid game", limit=POSTS))
+
+
+if __name__ == "__main__":
+    reddit = reddit_client.get_reddit()
+    reddit._core = reddit._read_only_core = FakeCore()
+    assert objectified(reddit) == raw(reddit), "results differ"
+
+    print(f"search listing, {POSTS} posts in pages of {PAGE_SIZE}")
+    results = {}
+    for name, fn in (("praw objects", objectified), ("search_raw", raw)):
+        seconds = min(timeit.repeat(lambda: fn(reddit), number=1, repeat=REPEAT))
+        tracemalloc.start()
+        fn(reddit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = seconds
+        print(f"  {name:14s} {seconds * 1000:7.1f} ms  peak {peak / 1024:6.0f} KiB")
+    print(f"  speedup: {results['praw objects'] / results['search_raw']:.1f}x")
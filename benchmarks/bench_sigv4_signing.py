@@ -0,0 +1,59 @@
+"""Per-request SigV4 signing overhead with and without the signing key cache.
+
+Run from the repository root:
+
+    PYTHONPATH=layer/python python benchmarks/bench_sigv4_signing.py
+"""
+import timeit
+
+from botocore import auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+N = 20000
+
+credentials = Credentials("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+
+
+def make_request():
+    return AWSRequest(
+        method="POST",
+        url="https://dynamodb.us-east-1.amazonaws.com/",
+        data=b'{"TableName": "batches", "Key": {"batch_id": {"S": "20240101_0"}}}',
+        headers={"Content-Type": "application/x-amz-json-1.0", "X-Amz-Target": "DynamoDB_20120810.GetItem"},
+    )
+
+
+def sign(request):
+    auth.SigV4Auth(credentials, "dynamodb", "us-east-1").add_auth(request)
+
+
+def sign_uncached(request):
+    # the behaviour before the cache: the signing key is derived on every request
+    auth._SIGNING_KEY_CACHE.clear()
+    sign(request)
+
+
+def run(label, fn):
+    requests = [make_request() for _ in range(N)]
+    it = iter(requests)
+    seconds = timeit.timeit(lambda: fn(next(it)), number=N)
+    per_call = seconds / N * 1e6
+    print(f"{label:26s} {per_call:7.2f} us/request")
+    return per_call
+
+
+if __name__ == "__main__":
+    signature_only = auth.SigV4Auth(credentials, "dynamodb", "us-east-1")
+    request = make_request()
+    request.context["timestamp"] = "20240101T000000Z"
+    string_to_sign = "AWS4-HMAC-SHA256\n20240101T000000Z\n20240101/us-east-1/dynamodb/aws4_request\n" + "0" * 64
+
+    derive = timeit.timeit(lambda: (auth._SIGNING_KEY_CACHE.clear(), signature_only.signature(string_to_sign, request)), number=N)
+    cached = timeit.timeit(lambda: signature_only.signature(string_to_sign, request), number=N)
+    print(f"{'signature(), derived':26s} {derive / N * 1e6:7.2f} us/call")
+    print(f"{'signature(), cached':26s} {cached / N * 1e6:7.2f} us/call")
+
+    before = run("add_auth(), derived", sign_uncached)
+    after = run("add_auth(), cached", sign)
+    print(f"saved per request: {before - after:.2f} us ({(before - after) / before:.0%})")
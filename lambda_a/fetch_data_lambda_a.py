@@ -1,35 +1,60 @@
 import os
 import json
 import boto3
-import math
 from datetime import datetime
 from backend.fetch_data import fetch_all
+from backend.sampling import stratified_sample, SAMPLING_THRESHOLD
+from backend import checkpoints
 
 S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 sqs_client = boto3.client("sqs")
 SQS_QUEUE_URL = os.environ.get("SQS_QUEUE_URL")
+# optional: per (keyword, source) cursors, so repeat runs only fetch new content
+CHECKPOINT_TABLE = os.environ.get("CHECKPOINT_TABLE")
+checkpoint_table = boto3.resource("dynamodb").Table(CHECKPOINT_TABLE) if CHECKPOINT_TABLE else None
 
-def run_a(keyword=None):
-    raw_data = fetch_all(keyword=keyword)
+def run_a(keyword=None, sample=False, priority="interactive"):
+    cursors = checkpoints.load(checkpoint_table, keyword) if checkpoint_table and keyword else None
+    # from existing checkpoints only new posts are fetched, lambda_c merges them with the keyword's earlier results
+    incremental = bool(cursors) and any(cursors.values())
+    raw_data = fetch_all(keyword=keyword, cursors=cursors, priority=priority)
+    # for very large runs only a stratified sample (by source and day) is analyzed
+    if sample and len(raw_data) > SAMPLING_THRESHOLD:
+        population = len(raw_data)
+        raw_data = stratified_sample(raw_data)
+        print(f"Sampled {len(raw_data)} of {population} posts")
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     batch_size = 10
+    batches = [raw_data[i:i+batch_size] for i in range(0, len(raw_data), batch_size)]
+    if incremental and not batches:
+        # nothing new since the checkpoints: one empty batch still runs lambda_b and lambda_c,
+        # so the client gets the insight on the earlier results
+        batches = [[]]
 
-    for i in range(0, len(raw_data), batch_size):
-        batch = raw_data[i:i+batch_size]
-        batch_id = f"{timestamp}_{i//batch_size}"
+    for i, batch in enumerate(batches):
+        batch_id = f"{timestamp}_{i}"
         message = {
             "batch_id": batch_id,
+            "keyword": keyword,
             "items": batch
         }
+        if cursors is not None:
+            message["incremental"] = incremental
         sqs_client.send_message(
             QueueUrl=SQS_QUEUE_URL,
             MessageBody=json.dumps(message)
         )
 
-    print(f"Sent {math.ceil(len(raw_data) / batch_size)} batches to SQS")
-    return {"message": f"Sent {math.ceil(len(raw_data) / batch_size)} batches to SQS"}
+    print(f"Sent {len(batches)} batches to SQS")
+    if cursors is not None:
+        checkpoints.save(checkpoint_table, keyword, cursors)
+    return {"message": f"Sent {len(batches)} batches to SQS"}
 
 
 def lambda_handler(event, context):
-    keyword = event.get("queryStringParameters", {}).get("keyword", None)
-    return run_a(keyword)
+    params = event.get("queryStringParameters") or {}
+    keyword = params.get("keyword", None)
+    sample = str(params.get("sample", "false")).lower() == "true"
+    # scheduled refreshes (EventBridge) yield YouTube quota to runs a user is waiting for
+    priority = "background" if event.get("source") == "aws.events" else "interactive"
+    return run_a(keyword, sample=sample, priority=priority)
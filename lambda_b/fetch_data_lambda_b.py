@@ -1,7 +1,10 @@
 import os
 import json
 import boto3
-from backend.fetch_data import analyze_sentiments_batch
+from urllib.parse import quote
+from backend.fetch_data import analyze_sentiments_pooled
+from backend.connections import broadcast, WILDCARD_KEYWORD
+from backend import idempotency
 
 s3_client = boto3.client("s3")
 dynamodb = boto3.resource("dynamodb")
@@ -10,62 +13,117 @@ apigw_client = boto3.client("apigatewaymanagementapi", endpoint_url=os.environ.g
 S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 CONNECTIONS_TABLE = os.environ.get("CONNECTIONS_TABLE")
 BATCH_COUNT_TABLE = os.environ.get("BATCH_COUNT_TABLE")
+# optional: without it redelivered batches are analyzed again
+IDEMPOTENCY_TABLE = os.environ.get("IDEMPOTENCY_TABLE")
 
 conn_table = dynamodb.Table(CONNECTIONS_TABLE)
 batch_table = dynamodb.Table(BATCH_COUNT_TABLE)
+idempotency_table = dynamodb.Table(IDEMPOTENCY_TABLE) if IDEMPOTENCY_TABLE else None
+
+# parse one SQS record into its message, batch id and cleaned items
+def parse_record(record):
+    message = json.loads(record['body'])
+    batch_id = message['batch_id']
+    items = message['items']
+
+    if isinstance(items, str):
+        items = json.loads(items)
+
+    cleaned_items = []
+    for item in items:
+        if isinstance(item, str):
+            try:
+                item = json.loads(item)
+            except json.JSONDecodeError:
+                print(f"Skipped malformed item: {item}")
+                continue
+        cleaned_items.append(item)
+
+    return message, batch_id, cleaned_items
+
+# store the analyzed items of one batch and notify its subscribers
+def store_batch(message, batch_id, analyzed):
+    s3_key = f"analyzed_data/{batch_id}.json"
+    # checkpointed runs: lambda_c needs the keyword and whether to merge with its earlier results,
+    # also for the empty batch of a run without new posts
+    metadata = {}
+    if "incremental" in message:
+        metadata = {"keyword": quote(message.get("keyword") or ""), "incremental": str(message["incremental"]).lower()}
+    s3_client.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=s3_key,
+        Body=json.dumps(analyzed),
+        ContentType="application/json",
+        Metadata=metadata
+    )
+
+    print(f"Stored analyzed data for batch {batch_id}")
+    batch_table.put_item(Item={"batch_id": batch_id, "status": "done"})
+
+    # the batch is stored at this point, so a failed notification must not trigger a redelivery
+    try:
+        # connection list is cached across records, see backend.connections
+        # only clients subscribed to this keyword are notified
+        keyword = message.get("keyword") or next((i.get("keyword") for i in analyzed if i.get("keyword")), None)
+        broadcast(apigw_client, conn_table, "batch_completed", {"batch_id": batch_id}, keyword=keyword or WILDCARD_KEYWORD)
+    except Exception as e:
+        print(f"Failed to notify batch_completed for {batch_id}: {e}")
+    return s3_key
 
 def lambda_handler(event, context):
-    print(f"Received {len(event.get('Records', []))} records from SQS")
+    records = event.get('Records', [])
+    print(f"Received {len(records)} records from SQS")
 
-    for record in event.get('Records', []):
-        try:
-            message = json.loads(record['body'])
-            batch_id = message['batch_id']
-            items = message['items']
-
-            if isinstance(items, str):
-                items = json.loads(items)
-
-            cleaned_items = []
-            for item in items:
-                if isinstance(item, str):
-                    try:
-                        item = json.loads(item)
-                    except json.JSONDecodeError:
-                        print(f"Skipped malformed item: {item}")
-                        continue
-                cleaned_items.append(item)
+    # report only the failed messages so SQS does not redeliver (and re-analyze) the rest,
+    # requires ReportBatchItemFailures on the event source mapping
+    batch_item_failures = []
+
+    def fail(record, e, key=None):
+        print(f"Failed to process record {record.get('messageId')}: {e}")
+        batch_item_failures.append({"itemIdentifier": record["messageId"]})
+        if key and idempotency_table:
+            # best effort, an unreleased claim simply expires
+            try:
+                idempotency.release(idempotency_table, key)
+            except Exception as release_error:
+                print(f"Failed to release claim {key}: {release_error}")
 
+    # claim every record first; SQS is at-least-once, so batches already stored are skipped
+    pending = []
+    for record in records:
+        try:
+            message, batch_id, cleaned_items = parse_record(record)
+            key = idempotency.idempotency_key(batch_id, cleaned_items)
+            done = idempotency.claim(idempotency_table, key) if idempotency_table else None
+            if done:
+                print(f"Batch {batch_id} already processed, result at {done['resultKey']}")
+                continue
             print(f"Processing batch {batch_id} with {len(cleaned_items)} items")
+            pending.append((record, message, batch_id, cleaned_items, key))
+        except Exception as e:
+            fail(record, e)
+
+    # items of all records share the Bedrock calls, labels are written back onto each record's items;
+    # records with items from a failed call are redelivered rather than stored with missing labels
+    try:
+        failed = set(analyze_sentiments_pooled([cleaned_items for _, _, _, cleaned_items, _ in pending]))
+    except Exception as e:
+        for record, _, _, _, key in pending:
+            fail(record, e, key)
+        pending = []
+        failed = set()
+    for i in sorted(failed):
+        record, _, batch_id, _, key = pending[i]
+        fail(record, f"sentiment analysis failed for batch {batch_id}", key)
+    pending = [p for i, p in enumerate(pending) if i not in failed]
 
-            analyzed = analyze_sentiments_batch(cleaned_items)
-
-            s3_key = f"analyzed_data/{batch_id}.json"
-            s3_client.put_object(
-                Bucket=S3_BUCKET_NAME,
-                Key=s3_key,
-                Body=json.dumps(analyzed),
-                ContentType="application/json"
-            )
-
-            print(f"Stored analyzed data for batch {batch_id}")
-            batch_table.put_item(Item={"batch_id": batch_id, "status": "done"})
-
-            connections = conn_table.scan()["Items"]
-            for conn in connections:
-                try:
-                    apigw_client.post_to_connection(
-                        ConnectionId=conn["connectionId"],
-                        Data=json.dumps({
-                            "event": "batch_completed",
-                            "payload": {"batch_id": batch_id}
-                        }).encode("utf-8")
-                    )
-                    print(f"Sent batch_completed to {conn['connectionId']}")
-                except apigw_client.exceptions.GoneException:
-                    print(f"Connection gone, deleting {conn['connectionId']}")
-                    conn_table.delete_item(Key={"connectionId": conn["connectionId"]})
+    for record, message, batch_id, cleaned_items, key in pending:
+        try:
+            s3_key = store_batch(message, batch_id, cleaned_items)
+            if idempotency_table:
+                idempotency.complete(idempotency_table, key, s3_key)
         except Exception as e:
-            print(f"Failed to process record: {e}")
+            fail(record, e, key)
 
-    return {"message": f"Processed {len(event.get('Records', []))} batches"}
+    print(f"Processed {len(records) - len(batch_item_failures)} of {len(records)} batches")
+    return {"batchItemFailures": batch_item_failures}
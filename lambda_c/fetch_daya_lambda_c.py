@@ -3,7 +3,12 @@ import json
 import boto3
 import time
 from datetime import datetime
+from urllib.parse import unquote
 from backend.fetch_data import generate_insight
+from backend.dynamo import scan_items
+from backend.connections import broadcast, get_subscribers
+from backend.sampling import estimate_ratios
+from backend import checkpoints
 from botocore.exceptions import ClientError
 
 # AWS clients
@@ -23,6 +28,10 @@ batch_table = dynamodb.Table(BATCH_COUNT_TABLE)
 lock_table = dynamodb.Table(LOCK_TABLE)
 
 LOCK_KEY = "aggregate_lock" # global lock key for aggregation
+SCAN_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", "4")) # parallel scan segments for the batch table
+# newest posts sent with insight_completed, the stats and trend cover all of them;
+# API Gateway rejects WebSocket messages over 128 KB
+INSIGHT_POSTS_LIMIT = int(os.environ.get("INSIGHT_POSTS_LIMIT", "100"))
 
 def acquire_lock():
     try:
@@ -59,34 +68,39 @@ def lambda_handler(event, context):
 
     try:
         # scan all batch records
-        all_batches = batch_table.scan()["Items"]
+        all_batches = list(scan_items(batch_table, projection=["batch_id", "status"], total_segments=SCAN_SEGMENTS))
         if not all([b["status"] == "done" for b in all_batches]):
             print("Not all batches done yet. Releasing lock and exiting...")
             return
 
-        connections = conn_table.scan().get("Items", [])
-        if not connections:
-            print("No WebSocket connections found, insight_completed will not be sent")
-
         # aggregate all batch data
         aggregated_data = []
         keywords = set() 
-        for b in all_batches:
-            obj = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=f"analyzed_data/{b['batch_id']}.json")
-            batch_data = json.loads(obj["Body"].read())  
-            aggregated_data.extend(batch_data)
-            batch_table.delete_item(Key={"batch_id": b["batch_id"]})
-            
-            # collect keywords
-            for item in batch_data:
-                if "keyword" in item and item["keyword"]:
-                    keywords.add(item["keyword"])
-
-            batch_table.delete_item(Key={"batch_id": b["batch_id"]})
-
-            # print sample items and sentiment types for debugging
-            for item in batch_data[:3]:
-                print("Sample item:", item, "sentiment type:", type(item.get("sentiment")))
+        # set by lambda_b for runs of lambda_a with checkpoints, see store_batch
+        checkpointed = incremental = False
+        # batch records are deleted in the background while S3 objects are read
+        with batch_table.batch_writer(overwrite_by_pkeys=["batch_id"], max_concurrency=4) as batch_writer:
+            for b in all_batches:
+                obj = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=f"analyzed_data/{b['batch_id']}.json")
+                batch_data = json.loads(obj["Body"].read())  
+                run = obj.get("Metadata") or {}
+                if "incremental" in run:
+                    checkpointed = True
+                    incremental = incremental or run["incremental"] == "true"
+                    # the empty batch of a run without new posts has no items to take the keyword from
+                    if run.get("keyword"):
+                        keywords.add(unquote(run["keyword"]))
+                aggregated_data.extend(batch_data)
+                batch_writer.delete_item(Key={"batch_id": b["batch_id"]})
+                
+                # collect keywords
+                for item in batch_data:
+                    if "keyword" in item and item["keyword"]:
+                        keywords.add(item["keyword"])
+
+                # print sample items and sentiment types for debugging
+                for item in batch_data[:3]:
+                    print("Sample item:", item, "sentiment type:", type(item.get("sentiment")))
 
         print(f"Aggregated {len(aggregated_data)} items from all batches")
         if keywords:
@@ -94,17 +108,41 @@ def lambda_handler(event, context):
         else:
             keyword = event.get("keyword", "Unknown")
 
+        # a checkpointed run keeps the keyword's posts; an incremental one only fetched new posts,
+        # so they are merged with the earlier ones and the insight covers all of them
+        if checkpointed:
+            if incremental:
+                previous = checkpoints.load_results(s3_client, S3_BUCKET_NAME, keyword)
+                aggregated_data = checkpoints.merge_results(previous, aggregated_data)
+                print(f"Merged with {len(previous)} earlier posts for {keyword}: {len(aggregated_data)} posts")
+            aggregated_data = checkpoints.trim_results(aggregated_data)
+            checkpoints.save_results(s3_client, S3_BUCKET_NAME, keyword, aggregated_data)
+
         # compute statistics and trends for insight and chart
         def compute_stats(items):
             total = len(items)
             positive = sum(1 for x in items if str(x.get("sentiment")).lower() == "positive")
             negative = sum(1 for x in items if str(x.get("sentiment")).lower() == "negative")
-            return {
+            stats = {
                 "positiveRatio": round(positive / total * 100, 2) if total else 0,
                 "negativeRatio": round(negative / total * 100, 2) if total else 0,
                 "topics": [x.get("title") for x in items if "title" in x][:5],
-                "total": total
+                "total": total,
+                # per-run count of labels from the local classifier, the distilled model and Bedrock
+                "labelSources": {
+                    "local": sum(1 for x in items if x.get("sentiment_source") == "local"),
+                    "model": sum(1 for x in items if x.get("sentiment_source") == "model"),
+                    "llm": sum(1 for x in items if x.get("sentiment_source") == "llm")
+                }
             }
+            # sampled run: report weighted estimates with 95% intervals instead of raw sample ratios
+            if items and all("stratum" in x for x in items):
+                estimates = estimate_ratios(items)
+                stats["positiveRatio"] = estimates["ratios"]["Positive"]["value"]
+                stats["negativeRatio"] = estimates["ratios"]["Negative"]["value"]
+                stats["neutralRatio"] = estimates["ratios"]["Neutral"]["value"]
+                stats["estimates"] = estimates
+            return stats
 
         def compute_trend(posts):
             """
@@ -123,11 +161,12 @@ def lambda_handler(event, context):
                 sentiment = str(p.get("sentiment", "Neutral")).capitalize()
                 if sentiment not in ["Positive", "Negative", "Neutral"]:
                     sentiment = "Neutral"
-                trend_map[date][sentiment] += 1
+                # sampled posts stand for sample_weight posts of their stratum
+                trend_map[date][sentiment] += p.get("sample_weight", 1)
 
             trend_list = []
             for date in sorted(trend_map.keys()):
-                trend_list.append({"date": date, **trend_map[date]})
+                trend_list.append({"date": date, **{k: round(v) for k, v in trend_map[date].items()}})
             return trend_list
 
 
@@ -152,30 +191,23 @@ def lambda_handler(event, context):
         )
         print(f"Insight saved to {insight_key}")
 
-        # WebSocket notifications
-        connections = conn_table.scan().get("Items", [])
-        print(f"Connections: {connections}")
-        print(conn_table.scan())
-        for conn in connections:
-            try:
-                payload = {
-                    "event": "insight_completed",
-                    "payload": {
-                        "insight": insight_text,           
-                        "posts": aggregated_data,          
-                        "stats": stats,                    
-                        "trend": compute_trend(aggregated_data),  
-                        "progress": {"completedBatches": len(all_batches), "totalBatches": len(all_batches)}
-                    }
-                }
-                apigw_client.post_to_connection(
-                    ConnectionId=conn["connectionId"],
-                    Data=json.dumps(payload).encode("utf-8")
-                )
-
-                print(f"Sent insight_completed to {conn['connectionId']}")
-            except apigw_client.exceptions.GoneException:
-                conn_table.delete_item(Key={"connectionId": conn["connectionId"]})
+        # the insight is saved and the batch records are gone at this point, so a failed notification
+        # must not fail the invocation: the S3 retry would aggregate again from a single batch
+        try:
+            # WebSocket notifications, routed to the clients subscribed to this keyword
+            subscribers = get_subscribers(conn_table, keyword)
+            print(f"Subscribers for {keyword}: {subscribers}")
+            if not subscribers:
+                print("No WebSocket subscribers found, insight_completed will not be sent")
+            broadcast(apigw_client, conn_table, "insight_completed", {
+                "insight": insight_text,
+                "posts": sorted(aggregated_data, key=lambda x: x.get("created_utc") or 0, reverse=True)[:INSIGHT_POSTS_LIMIT],
+                "stats": stats,
+                "trend": compute_trend(aggregated_data),
+                "progress": {"completedBatches": len(all_batches), "totalBatches": len(all_batches)}
+            }, keyword=keyword)
+        except Exception as e:
+            print(f"Failed to notify insight_completed for {keyword}: {e}")
 
     finally:
         release_lock() # always release lock at the end
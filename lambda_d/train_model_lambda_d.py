@@ -0,0 +1,13 @@
+import os
+import boto3
+from backend.distill import train_and_publish
+
+S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
+s3_client = boto3.client("s3")
+
+# scheduled stage: distill accumulated Bedrock labels into a local model for lambda_b
+def lambda_handler(event, context):
+    model = train_and_publish(s3_client, S3_BUCKET_NAME)
+    if not model:
+        return {"message": "Not enough labelled data to train a model"}
+    return {"message": f"Published model {model['version']}", "evaluation": model["evaluation"]}
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+from urllib.parse import quote
+from botocore.exceptions import ClientError
+
+CHECKPOINT_TTL = int(os.environ.get("CHECKPOINT_TTL", str(30 * 24 * 3600))) # seconds; a keyword idle this long starts over
+SOURCES = ("reddit", "youtube")
+RESULTS_PREFIX = os.environ.get("KEYWORD_RESULTS_PREFIX", "keyword_results/") # S3 prefix of the posts analyzed per keyword
+RESULTS_MAX_POSTS = int(os.environ.get("KEYWORD_RESULTS_MAX_POSTS", "2000")) # newest posts kept per keyword
+
+
+def checkpoint_id(keyword, source):
+    return f"{source}#{keyword.strip().lower()}"
+
+# load the cursor of every source for a keyword; sources without a checkpoint get an empty cursor
+def load(table, keyword, sources=SOURCES):
+    cursors = {}
+    for source in sources:
+        item = table.get_item(Key={"checkpointId": checkpoint_id(keyword, source)}).get("Item") or {}
+        cursor = dict(item.get("cursor") or {})
+        # numbers come back from DynamoDB as Decimal
+        if "newestCreatedUtc" in cursor:
+            cursor["newestCreatedUtc"] = int(cursor["newestCreatedUtc"])
+        cursors[source] = cursor
+    return cursors
+
+# persist the cursors advanced by a run, only after its items were handed on
+def save(table, keyword, cursors):
+    now = int(time.time())
+    for source, cursor in cursors.items():
+        if not cursor:
+            continue
+        table.put_item(Item={
+            "checkpointId": checkpoint_id(keyword, source),
+            "keyword": keyword,
+            "source": source,
+            "cursor": cursor,
+            "updatedAt": now,
+            "expiresAt": now + CHECKPOINT_TTL
+        })
+
+# S3 key of the analyzed posts kept for a keyword, so incremental runs can report on all of them
+def results_key(keyword):
+    return f"{RESULTS_PREFIX}{quote(keyword.strip().lower(), safe='')}.json"
+
+# posts analyzed for a keyword by earlier runs; empty if there are none
+def load_results(s3_client, bucket, keyword):
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket, Key=results_key(keyword))["Body"].read())
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return []
+        raise
+
+def save_results(s3_client, bucket, keyword, posts):
+    s3_client.put_object(Bucket=bucket, Key=results_key(keyword), Body=json.dumps(posts), ContentType="application/json")
+
+# earlier posts plus the new ones, deduplicated by (url, source) as in fetch_all; a post analyzed again replaces its old copy
+def merge_results(previous, posts):
+    merged = {(p.get("url"), p.get("source")): p for p in previous}
+    merged.update({(p.get("url"), p.get("source")): p for p in posts})
+    return list(merged.values())
+
+# the newest max_posts posts, so the stored set and each read and rewrite of it stay bounded
+def trim_results(posts, max_posts=RESULTS_MAX_POSTS):
+    if len(posts) <= max_posts:
+        return posts
+    return sorted(posts, key=lambda p: p.get("created_utc") or 0, reverse=True)[:max_posts]
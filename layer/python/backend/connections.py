@@ -0,0 +1,75 @@
+import os
+import json
+from cachetools import TTLCache
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from backend.dynamo import scan_items, query_items
+
+CONNECTIONS_TTL = int(os.environ.get("CONNECTIONS_TTL", "30")) # seconds a cached connection list stays valid
+# optional GSI on the "keyword" attribute; without it every event goes to every connection
+SUBSCRIPTIONS_INDEX = os.environ.get("SUBSCRIPTIONS_INDEX")
+WILDCARD_KEYWORD = "*" # subscribers that want events for every keyword
+
+# connection ids per (table name, keyword), shared by every record in a warm container
+_connections_cache = TTLCache(maxsize=256, ttl=CONNECTIONS_TTL)
+
+# register a connection for the keyword (or run_id) it is watching
+def subscribe(table, connection_id, keyword=None):
+    table.put_item(Item={"connectionId": connection_id, "keyword": keyword or WILDCARD_KEYWORD})
+    for key in [(table.name, None), (table.name, keyword or WILDCARD_KEYWORD)]:
+        _connections_cache.pop(key, None)
+
+# return cached connection ids, refreshing them with a single paginated read once the TTL expires
+def get_connections(table, keyword=None):
+    cache_key = (table.name, keyword)
+    connections = _connections_cache.get(cache_key)
+    if connections is None:
+        if keyword is None:
+            items = scan_items(table, projection=["connectionId"])
+        else:
+            items = query_items(
+                table,
+                IndexName=SUBSCRIPTIONS_INDEX,
+                KeyConditionExpression=Key("keyword").eq(keyword),
+                ProjectionExpression="connectionId"
+            )
+        connections = [c["connectionId"] for c in items]
+        _connections_cache[cache_key] = connections
+    return connections
+
+# connections subscribed to the keyword plus the wildcard ones when SUBSCRIPTIONS_INDEX is configured
+# (rows are then expected to be written through subscribe); otherwise, or if the index cannot be
+# queried, every connection from the cached scan
+def get_subscribers(table, keyword):
+    if not SUBSCRIPTIONS_INDEX or not keyword:
+        return get_connections(table)
+    try:
+        subscribers = get_connections(table, WILDCARD_KEYWORD)
+        if keyword != WILDCARD_KEYWORD:
+            subscribers = get_connections(table, keyword) + subscribers
+        return subscribers
+    except ClientError as e:
+        print(f"Could not route by keyword through {SUBSCRIPTIONS_INDEX}, notifying every connection: {e}")
+        return get_connections(table)
+
+# drop a connection from the local cache without forcing a re-read
+def discard_connection(table, connection_id):
+    for (table_name, _), connections in list(_connections_cache.items()):
+        if table_name == table.name and connection_id in connections:
+            connections.remove(connection_id)
+
+# send an event to the connections subscribed to the keyword (all of them if no keyword), removing the ones that are gone
+def broadcast(apigw_client, table, event, payload, keyword=None):
+    data = json.dumps({"event": event, "payload": payload}).encode("utf-8")
+    connections = get_connections(table) if keyword is None else get_subscribers(table, keyword)
+    for connection_id in list(connections):
+        try:
+            apigw_client.post_to_connection(ConnectionId=connection_id, Data=data)
+            print(f"Sent {event} to {connection_id}")
+        except apigw_client.exceptions.GoneException:
+            print(f"Connection gone, deleting {connection_id}")
+            table.delete_item(Key={"connectionId": connection_id})
+            discard_connection(table, connection_id)
+        except Exception as e:
+            # e.g. a payload over the WebSocket message limit; the other connections still get the event
+            print(f"Failed to send {event} to {connection_id}: {e}")
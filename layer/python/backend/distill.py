@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import math
+import random
+import zlib
+from datetime import datetime
+from cachetools import TTLCache
+from botocore.exceptions import ClientError
+
+MODEL_PREFIX = os.environ.get("DISTILLED_MODEL_PREFIX", "models/sentiment/")
+DISTILLED_MODEL_ENABLED = os.environ.get("DISTILLED_MODEL_ENABLED", "true").lower() == "true"
+TARGET_ACCURACY = float(os.environ.get("DISTILLED_TARGET_ACCURACY", "0.95")) # held-out accuracy the model must reach on items it answers
+MODEL_CACHE_TTL = int(os.environ.get("DISTILLED_MODEL_CACHE_TTL", "3600")) # seconds before checking S3 for a newer version
+
+LABELS = ("Positive", "Negative", "Neutral")
+HASH_BITS = 18 # 262k feature buckets
+HOLDOUT_PERCENT = 20
+MIN_TRAINING_ITEMS = 200
+MIN_HOLDOUT_ITEMS = int(os.environ.get("DISTILLED_MIN_HOLDOUT_ITEMS", "200")) # held-out titles needed to certify a threshold at all
+MIN_ANSWERED_ITEMS = int(os.environ.get("DISTILLED_MIN_ANSWERED_ITEMS", "50")) # held-out titles the model must answer at the threshold
+CONFIDENCE_Z = 1.96 # the 95% lower bound on held-out accuracy is what must reach TARGET_ACCURACY
+TRAINING_SET_KEY = f"{MODEL_PREFIX}training_set.json" # labelled titles collected so far and how far analyzed_data was read
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+|[^\sa-z0-9]")
+_model_cache = TTLCache(maxsize=1, ttl=MODEL_CACHE_TTL)
+
+# hashed word unigrams and bigrams of a text
+def features(text):
+    tokens = _TOKEN_PATTERN.findall(str(text or "").lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    mask = (1 << HASH_BITS) - 1
+    return {zlib.crc32(g.encode("utf-8")) & mask for g in grams}
+
+def _softmax(scores):
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+# class probabilities for one text; weights map a feature bucket to one weight per label
+def predict_proba(model, text):
+    weights = model["weights"]
+    scores = list(model["bias"])
+    for f in features(text):
+        w = weights.get(f)
+        if w:
+            for k in range(len(LABELS)):
+                scores[k] += w[k]
+    return _softmax(scores)
+
+# multinomial logistic regression trained with plain SGD on sparse hashed features
+def train(examples, epochs=8, learning_rate=0.5, l2=1e-6, seed=0):
+    rng = random.Random(seed)
+    weights, bias = {}, [0.0] * len(LABELS)
+    data = [(features(text), LABELS.index(label)) for text, label in examples]
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        rate = learning_rate / (1 + epoch)
+        for feats, target in data:
+            scores = list(bias)
+            for f in feats:
+                w = weights.get(f)
+                if w:
+                    for k in range(len(LABELS)):
+                        scores[k] += w[k]
+            probs = _softmax(scores)
+            for k in range(len(LABELS)):
+                grad = probs[k] - (1.0 if k == target else 0.0)
+                bias[k] -= rate * grad
+                for f in feats:
+                    w = weights.setdefault(f, [0.0] * len(LABELS))
+                    w[k] -= rate * (grad + l2 * w[k])
+    # drop buckets that never moved to keep the stored model small
+    weights = {f: [round(x, 5) for x in w] for f, w in weights.items() if any(abs(x) > 1e-4 for x in w)}
+    return {"weights": weights, "bias": bias}
+
+# Wilson score lower bound of an accuracy of `correct` out of `answered`
+def accuracy_lower_bound(correct, answered, z=CONFIDENCE_Z):
+    if not answered:
+        return 0.0
+    p = correct / answered
+    centre = p + z * z / (2 * answered)
+    margin = z * math.sqrt(p * (1 - p) / answered + z * z / (4 * answered * answered))
+    return (centre - margin) / (1 + z * z / answered)
+
+# pick the lowest confidence threshold at which the lower bound of held-out accuracy on the answered items
+# reaches the target, answering at least MIN_ANSWERED_ITEMS; no threshold on fewer than MIN_HOLDOUT_ITEMS
+def choose_threshold(model, holdout, target_accuracy=TARGET_ACCURACY):
+    scored = []
+    for text, label in holdout:
+        probs = predict_proba(model, text)
+        best = max(range(len(LABELS)), key=probs.__getitem__)
+        scored.append((probs[best], LABELS[best] == label))
+    scored.sort(reverse=True)
+    threshold, coverage, accuracy, lower_bound = None, 0.0, None, None
+    correct = 0
+    if len(scored) >= MIN_HOLDOUT_ITEMS:
+        for answered, (confidence, is_correct) in enumerate(scored, start=1):
+            correct += is_correct
+            if answered < MIN_ANSWERED_ITEMS:
+                continue
+            bound = accuracy_lower_bound(correct, answered)
+            if bound >= target_accuracy:
+                threshold, coverage, accuracy, lower_bound = confidence, answered / len(scored), correct / answered, bound
+    return {
+        "threshold": threshold,
+        "coverage": round(coverage, 3),
+        "accuracy": round(accuracy, 3) if accuracy else None,
+        "accuracy_lower_bound": round(lower_bound, 3) if lower_bound else None,
+        "holdout": len(scored)
+    }
+
+# training set snapshot from the previous run, empty on the first one
+def load_training_snapshot(s3_client, bucket):
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket, Key=TRAINING_SET_KEY)["Body"].read())
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return {"examples": {}, "watermark": None, "watermark_keys": []}
+        raise
+
+# Bedrock-labelled titles from analyzed_data, deduplicated; local labels are skipped so the model only learns from the LLM.
+# Titles collected by earlier runs come from the snapshot, so only objects written since its watermark are read.
+def collect_training_set(s3_client, bucket, prefix="analyzed_data/"):
+    snapshot = load_training_snapshot(s3_client, bucket)
+    examples = snapshot["examples"]
+    watermark = datetime.fromisoformat(snapshot["watermark"]) if snapshot["watermark"] else None
+    # objects written in the same second as the watermark may not all have been read yet
+    seen_at_watermark = set(snapshot["watermark_keys"])
+    new_objects = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            modified = obj["LastModified"]
+            if watermark and (modified < watermark or (modified == watermark and obj["Key"] in seen_at_watermark)):
+                continue
+            new_objects.append(obj)
+
+    for obj in new_objects:
+        items = json.loads(s3_client.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read())
+        for item in items:
+            label = str(item.get("sentiment", "")).capitalize()
+            if label in LABELS and item.get("sentiment_source", "llm") == "llm" and item.get("title"):
+                examples[item["title"]] = label
+
+    if new_objects:
+        newest = max(obj["LastModified"] for obj in new_objects)
+        if newest != watermark:
+            seen_at_watermark = set()
+        seen_at_watermark.update(obj["Key"] for obj in new_objects if obj["LastModified"] == newest)
+        snapshot = {"examples": examples, "watermark": newest.isoformat(), "watermark_keys": sorted(seen_at_watermark)}
+        s3_client.put_object(Bucket=bucket, Key=TRAINING_SET_KEY, Body=json.dumps(snapshot), ContentType="application/json")
+    print(f"Read {len(new_objects)} new analyzed objects, {len(examples)} labelled titles in total")
+    return list(examples.items())
+
+# deterministic split by title so a title never moves between train and holdout across runs
+def split(examples):
+    train_set, holdout = [], []
+    for text, label in examples:
+        (holdout if zlib.crc32(text.encode("utf-8")) % 100 < HOLDOUT_PERCENT else train_set).append((text, label))
+    return train_set, holdout
+
+# train, evaluate and store a new model version, then point latest.json at it
+def train_and_publish(s3_client, bucket):
+    examples = collect_training_set(s3_client, bucket)
+    if len(examples) < MIN_TRAINING_ITEMS:
+        print(f"Only {len(examples)} labelled titles, need {MIN_TRAINING_ITEMS} to train")
+        return None
+    train_set, holdout = split(examples)
+    model = train(train_set)
+    evaluation = choose_threshold(model, holdout)
+    version = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    model.update({"version": version, "labels": list(LABELS), "hash_bits": HASH_BITS, "trained_on": len(train_set), "evaluation": evaluation})
+    key = f"{MODEL_PREFIX}{version}.json"
+    s3_client.put_object(Bucket=bucket, Key=key, Body=json.dumps(model), ContentType="application/json")
+    s3_client.put_object(Bucket=bucket, Key=f"{MODEL_PREFIX}latest.json", Body=json.dumps({"key": key, **evaluation}), ContentType="application/json")
+    print(f"Published model {key}: {evaluation}")
+    return model
+
+# latest published model, cached per container; None if there is none yet
+def load_latest_model(s3_client, bucket):
+    if "model" in _model_cache:
+        return _model_cache["model"]
+    model = None
+    try:
+        latest = json.loads(s3_client.get_object(Bucket=bucket, Key=f"{MODEL_PREFIX}latest.json")["Body"].read())
+        model = json.loads(s3_client.get_object(Bucket=bucket, Key=latest["key"])["Body"].read())
+        model["weights"] = {int(f): w for f, w in model["weights"].items()}
+    except Exception as e:
+        print(f"No distilled model loaded: {e}")
+    _model_cache["model"] = model
+    return model
+
+# label items the model is confident about in place; returns the items that still need the LLM
+def prelabel_items(model, items):
+    threshold = (model or {}).get("evaluation", {}).get("threshold")
+    if threshold is None:
+        # the model never reached the target accuracy offline, so it answers nothing
+        return items
+    remaining = []
+    for item in items:
+        probs = predict_proba(model, item.get("title", ""))
+        best = max(range(len(LABELS)), key=probs.__getitem__)
+        if probs[best] >= threshold:
+            item["sentiment"] = LABELS[best]
+            item["sentiment_source"] = "model"
+        else:
+            remaining.append(item)
+    return remaining
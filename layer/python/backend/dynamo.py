@@ -0,0 +1,86 @@
+import queue
+import threading
+import concurrent.futures
+
+_SEGMENT_DONE = object()
+
+# build the ProjectionExpression with placeholders, since names like "status" are reserved words
+def _projection_kwargs(projection):
+    if not projection:
+        return {}
+    names = {f"#p{i}": name for i, name in enumerate(projection)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names
+    }
+
+# follow LastEvaluatedKey until the segment is exhausted, one page at a time
+def scan_pages(table, segment=None, total_segments=None, projection=None, **scan_kwargs):
+    kwargs = {**scan_kwargs, **_projection_kwargs(projection)}
+    if total_segments and total_segments > 1:
+        kwargs["Segment"] = segment
+        kwargs["TotalSegments"] = total_segments
+    while True:
+        response = table.scan(**kwargs)
+        yield response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+# follow LastEvaluatedKey through every page of a query
+def query_items(table, **query_kwargs):
+    kwargs = dict(query_kwargs)
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+# stream every item of a table, optionally as a parallel scan over total_segments
+def scan_items(table, projection=None, total_segments=1, max_queued_pages=8, **scan_kwargs):
+    if total_segments <= 1:
+        for page in scan_pages(table, projection=projection, **scan_kwargs):
+            yield from page
+        return
+
+    pages = queue.Queue(maxsize=max_queued_pages)
+    stop = threading.Event()
+
+    def scan_segment(segment):
+        try:
+            for page in scan_pages(table, segment, total_segments, projection, **scan_kwargs):
+                # wait for the consumer, but give up if it stopped reading
+                while not stop.is_set():
+                    try:
+                        pages.put(page, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        finally:
+            pages.put(_SEGMENT_DONE)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=total_segments) as executor:
+        futures = [executor.submit(scan_segment, segment) for segment in range(total_segments)]
+        try:
+            remaining = total_segments
+            while remaining:
+                page = pages.get()
+                if page is _SEGMENT_DONE:
+                    remaining -= 1
+                    continue
+                yield from page
+        finally:
+            stop.set()
+            # drain so no worker stays blocked on a full queue
+            while any(not f.done() for f in futures):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        for future in futures:
+            future.result()
@@ -1,102 +1,219 @@
 import os
 import json
 import random
-import subprocess
-import praw
-from googleapiclient.discovery import build
-import httplib2
 import boto3
+import re
 import time
 import concurrent.futures
+import datetime
+from collections import Counter
 from botocore.exceptions import ClientError
+from botocore import exceptions as botocore_exceptions
 from backend.aws_client import bedrock_client  
+from backend import packing
+from backend import lexicon
+from backend import distill
+from backend.reddit_client import get_reddit, share_token, search_many
+from backend.twitter_client import collect_tweets
+from backend.youtube_client import search_videos, enrich_statistics, YOUTUBE_ENRICH_STATISTICS
 
 MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+# cascade: a cheaper model labels first, only low-confidence items go to MODEL_ID
+FAST_MODEL_ID = os.environ.get("FAST_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+CASCADE_ENABLED = os.environ.get("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_CONFIDENCE_THRESHOLD = float(os.environ.get("CASCADE_CONFIDENCE_THRESHOLD", "0.8"))
+SENTIMENT_LABELS = ("Positive", "Negative", "Neutral")
+BEDROCK_CONCURRENCY = int(os.environ.get("BEDROCK_CONCURRENCY", "4")) # pooled calls in flight at once
 S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 s3_client = boto3.client("s3")
 
+class SentimentAnalysisError(Exception):
+    """Bedrock could not label a chunk of items.
+
+    retryable is True for throttling, 5xx and connection errors, which a later attempt may get past;
+    anything else (e.g. ValidationException, AccessDeniedException) would fail again the same way.
+    """
+
+    def __init__(self, items, retryable=False):
+        super().__init__(f"Sentiment analysis failed for {len(items)} items ({'retryable' if retryable else 'not retryable'})")
+        self.items = items
+        self.retryable = retryable
+
+
+# throttling and server-side errors clear up on their own, so they are retried and redelivered
+def is_retryable_error(error):
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return code in ("ThrottlingException", "ServiceUnavailableException", "ModelNotReadyException") or status >= 500
+    return isinstance(error, (botocore_exceptions.ConnectionError, botocore_exceptions.HTTPClientError))
+
+
+# attach the lexicon score of each text to its item, scored as one batch;
+# the searched keyword (usually a show name) is left out of the score
+def attach_sentiment_scores(items, texts, keyword=None):
+    keyword = keyword if isinstance(keyword, str) else None
+    for item, (score, _) in zip(items, lexicon.score_texts(texts, [keyword] * len(texts))):
+        item["sentiment_score"] = score
+    return items
+
 # Twitter 
+# query: one search or a list of searches, scraped in parallel (see backend.twitter_client)
 def fetch_tweets(query="", limit=10):
     try:
-        cmd = f"snscrape --jsonl twitter-search '{query}' --max-results {limit}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        tweets = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
-        for t in tweets:
-            t["sentiment_score"] = random.uniform(-1, 1)
-        return tweets
+        queries = [query] if isinstance(query, str) else list(query)
+        tweets = collect_tweets(queries, limit=limit)
+        return attach_sentiment_scores(tweets, [t.get("content", "") for t in tweets], keyword=query)
     except Exception as e:
         print("Error fetching tweets:", e)
         return []
 
 # Reddit 
-def fetch_reddit(query="", limit=10):
+# with a cursor (see backend.checkpoints) every post newer than its newestCreatedUtc is fetched
+# (up to REDDIT_CHECKPOINT_LIMIT, `limit` only caps a first run), and the cursor is advanced in place
+def fetch_reddit(query="", limit=10, cursor=None):
     try:
-        reddit = praw.Reddit(
-            client_id=os.environ.get("REDDIT_CLIENT_ID"),
-            client_secret=os.environ.get("REDDIT_SECRET"),
-            user_agent="audience-sentiment-agent"
-        )
-        posts = []
-        # search across all subreddits
-        for post in reddit.subreddit("all").search(query=query, sort="hot", limit=limit):
-            posts.append({
-                "title": post.title,
-                "score": post.score,
-                "url": post.url,
-                "created_utc": post.created_utc,
-                "sentiment_score": random.uniform(-1, 1)
-            })
-        return posts
+        # reused across warm invocations: no new OAuth token request or TLS handshake
+        reddit = get_reddit()
+        newer_than = cursor.get("newestCreatedUtc") if cursor is not None else None
+        # every configured sort and subreddit in parallel, as plain dicts of the fields we keep
+        posts = search_many(reddit, query, limit=limit, newer_than=newer_than)
+        share_token(reddit)
+        if cursor is not None and posts:
+            cursor["newestCreatedUtc"] = max([newer_than or 0] + [int(p.get("created_utc") or 0) for p in posts])
+        return attach_sentiment_scores(posts, [p["title"] for p in posts], keyword=query)
     except Exception as e:
         print("Error fetching Reddit posts:", e)
         return []
 
 # YouTube 
-def fetch_youtube(query="", max_results=10):
+# with a cursor only videos published after its publishedAfter are fetched (newest first); a backlog
+# deeper than one run's pages is drained over the next runs through the saved pageToken
+# priority: "interactive" or "background", see backend.quota
+def fetch_youtube(query="", pages=None, cursor=None, priority="interactive"):
     try:
-        YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
-        http = httplib2.Http(timeout=20)
-        youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY, http=http)
-        request = youtube.search().list(q=query, part="snippet", maxResults=max_results)
-        response = request.execute()
-        for item in response.get("items", []):
-            item["sentiment_score"] = random.uniform(-1, 1)
+        params = {"priority": priority}
+        if pages:
+            params["pages"] = pages
+        if cursor and cursor.get("publishedAfter"):
+            params.update(order="date", publishedAfter=cursor["publishedAfter"], page_token=cursor.get("pageToken"))
+        # full pages of projected fields, see backend.youtube_client
+        items, next_page_token = search_videos(query, **params)
+        if cursor is not None:
+            advance_youtube_cursor(cursor, items, next_page_token)
+        if YOUTUBE_ENRICH_STATISTICS:
+            # statistics are nice to have, the videos are kept without them
+            try:
+                enrich_statistics(items, priority=priority)
+            except Exception as e:
+                print("Error fetching YouTube statistics:", e)
+        attach_sentiment_scores(items, [item.get("snippet", {}).get("title", "") for item in items], keyword=query)
+        for item in items:
             if "url" not in item or not item["url"]:
                 video_id = item.get("id", {}).get("videoId")
                 item["url"] = f"https://www.youtube.com/watch?v={video_id}" if video_id else None
-        return response.get("items", [])
+        return items
     except Exception as e:
         print("Error fetching YouTube videos:", e)
+        # an expired page token would fail every later run as well
+        if cursor:
+            cursor.pop("pageToken", None)
         return []
 
-# analyze sentiments in batch
-def analyze_sentiments_batch(items, max_retries=5):
+def advance_youtube_cursor(cursor, items, next_page_token):
+    published = [item.get("snippet", {}).get("publishedAt") for item in items]
+    # RFC 3339 timestamps of the same form order as strings
+    newest = max([cursor.get("newestPublishedAt") or ""] + [p for p in published if p])
+    if newest:
+        cursor["newestPublishedAt"] = newest
+    if cursor.get("publishedAfter") and next_page_token:
+        # more new videos than one run fetches: keep the window and continue from the next page
+        cursor["pageToken"] = next_page_token
+    elif newest:
+        cursor.pop("pageToken", None)
+        # publishedAfter is inclusive, so start one second after the newest video seen
+        published_at = datetime.datetime.fromisoformat(newest.replace("Z", "+00:00")) + datetime.timedelta(seconds=1)
+        cursor["publishedAfter"] = published_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# analyze sentiments in batch; with raise_on_failure a failed Bedrock call raises SentimentAnalysisError
+# instead of labelling the items "Unknown". Each item is counted once in `tiers` under the tier that
+# settled it: "fast", "strong" or "failed"
+def analyze_sentiments_batch(items, max_retries=5, cascade=None, raise_on_failure=False, tiers=None):
     if not items:
         return []
+    if cascade is None:
+        cascade = CASCADE_ENABLED
+    if tiers is None:
+        tiers = Counter()
+
+    remaining = items
+    if cascade:
+        # fast tier: keep confident, well-formed labels and escalate the rest
+        results = invoke_sentiment_model(items, FAST_MODEL_ID, with_confidence=True, max_retries=max_retries)
+        remaining = []
+        for item, (sentiment, confidence) in zip(items, results or [(None, 0.0)] * len(items)):
+            if sentiment in SENTIMENT_LABELS and (confidence or 0.0) >= CASCADE_CONFIDENCE_THRESHOLD:
+                item["sentiment"] = sentiment
+            else:
+                remaining.append(item)
+        tiers["fast"] += len(items) - len(remaining)
+        if not remaining:
+            return items
+
+    try:
+        results = invoke_sentiment_model(remaining, MODEL_ID, max_retries=max_retries, raise_on_failure=raise_on_failure)
+    except SentimentAnalysisError:
+        tiers["failed"] += len(remaining)
+        raise
+    if results is None:
+        tiers["failed"] += len(remaining)
+        results = [("Unknown", None)] * len(remaining)
+    else:
+        tiers["strong"] += len(remaining)
+    for item, (sentiment, _) in zip(remaining, results):
+        item["sentiment"] = sentiment
+    return items
 
+# call one model for a numbered list of posts; returns [(label, confidence)], or None if the call failed
+# (with raise_on_failure a SentimentAnalysisError saying whether the failure is retryable instead)
+def invoke_sentiment_model(items, model_id, with_confidence=False, max_retries=5, raise_on_failure=False):
+    # number the posts so labels can be matched back even if the model skips a line,
+    # long posts are truncated to the per-item token budget
     prompts = [
-        f'Analyze the sentiment of this social media post about a TV show or movie titled "{item.get("title","")}". '
-        'Respond with only one word: Positive, Negative, or Neutral.'
-        for item in items
+        f'{i}. "{packing.item_text(item)}"'
+        for i, item in enumerate(items, start=1)
     ]
 
-    combined_prompt = "\n\n".join(prompts)
+    if with_confidence:
+        answer_format = (
+            "Respond with one line per post in the form <number>: <label> <confidence>, where label is Positive, Negative, or Neutral "
+            "and confidence is a number between 0 and 1 for how sure you are.\n\n"
+        )
+    else:
+        answer_format = "Respond with one line per post in the form <number>: <label>, where label is Positive, Negative, or Neutral.\n\n"
+    combined_prompt = (
+        "Analyze the sentiment of each social media post below about a TV show or movie.\n"
+        + answer_format
+        + "\n".join(prompts)
+    )
     body = {
         "anthropic_version": "bedrock-2023-05-31", # need to specify version
         "system": (
             "You are an expert social media analyst. Each post refers to a TV show or movie. "
-            "Respond with one word for sentiment: Positive, Negative, or Neutral. Maintain order."
+            "Respond with one word for sentiment per post: Positive, Negative, or Neutral. Maintain order."
         ),
         "messages": [{"role": "user", "content": combined_prompt}],
-        "max_tokens": 100,
+        # sized from the expected answer lines instead of a fixed 100
+        "max_tokens": packing.output_tokens(len(items), with_confidence=with_confidence),
         "temperature": 0.0
     }
 
     delay = 1
+    error = None
     for attempt in range(max_retries):
         try:
             response = bedrock_client.invoke_model(
-                modelId=MODEL_ID,
+                modelId=model_id,
                 body=json.dumps(body).encode("utf-8"),
                 accept="application/json",
                 contentType="application/json"
@@ -104,28 +221,102 @@ def analyze_sentiments_batch(items, max_retries=5):
             result_body = json.loads(response["body"].read())
             sentiments_text = result_body["content"][0]["text"].strip().split("\n")
 
-            for item, sentiment in zip(items, sentiments_text):
-                item["sentiment"] = sentiment.strip() or "Unknown"
-
             print("🔹 Bedrock raw response:", result_body)
             print("🔹 Parsed sentiments_text:", sentiments_text)
-            return items  
+            return parse_sentiments(sentiments_text, len(items))
 
         except ClientError as e:
-            code = e.response['Error']['Code']
-            if code == 'ThrottlingException':
+            error = e
+            if is_retryable_error(e):
                 time.sleep(delay + random.random())
                 delay *= 2
             else:
                 print(f"AWS ClientError: {e}")
                 break
         except Exception as e:
+            error = e
             print(f"Error invoking batch: {e}")
             break
 
-    for item in items:
-        item["sentiment"] = "Unknown"
-    return items
+    if raise_on_failure:
+        raise SentimentAnalysisError(items, retryable=error is not None and is_retryable_error(error))
+    return None
+
+# match "<number>: <label> [confidence]" lines back to their posts, falling back to line order
+def parse_sentiments(lines, count):
+    lines = [line.strip() for line in lines if line.strip()]
+    numbered = {}
+    for line in lines:
+        match = re.match(r"^\W*(\d+)\W*[:.)-]\s*(\w+)\W*(\d*\.?\d+)?", line)
+        if match:
+            confidence = float(match.group(3)) if match.group(3) else None
+            if confidence is not None and confidence > 1:
+                confidence /= 100 # answered as a percentage
+            numbered[int(match.group(1))] = (match.group(2).capitalize(), confidence)
+    if numbered:
+        return [numbered.get(i, ("Unknown", None)) for i in range(1, count + 1)]
+    return [(line, None) for line in (lines + ["Unknown"] * count)[:count]]
+
+# share of items settled by each tier, from the counts of one call
+def tier_hit_rates(tiers):
+    total = sum(tiers.values())
+    return {tier: round(count / total, 3) for tier, count in tiers.items() if count} if total else {}
+
+# analyze the items of several batches together, repacked into as few Bedrock calls as the budget allows;
+# items are labelled in place, so each group keeps its own labelled items.
+# Returns the indices of the groups that own items of a failed Bedrock call, they are not fully labelled
+def analyze_sentiments_pooled(item_groups, max_retries=5):
+    pooled = [item for items in item_groups for item in items]
+    # unambiguous posts are labelled by the local lexicon, only the rest go to Bedrock
+    ambiguous = lexicon.prelabel_items(pooled) if lexicon.LOCAL_CLASSIFIER_ENABLED else pooled
+    # then the model distilled from earlier Bedrock labels answers what it is confident about
+    if distill.DISTILLED_MODEL_ENABLED and ambiguous:
+        model = distill.load_latest_model(s3_client, S3_BUCKET_NAME)
+        if model:
+            ambiguous = distill.prelabel_items(model, ambiguous)
+    for item in ambiguous:
+        item["sentiment_source"] = "llm"
+    chunks = packing.pack_items(ambiguous, with_confidence=CASCADE_ENABLED)
+    print(f"Labelled {len(pooled) - len(ambiguous)} of {len(pooled)} items locally")
+    print(f"Analyzing {len(ambiguous)} items from {len(item_groups)} batches in {len(chunks)} Bedrock calls")
+    group_of = {id(item): i for i, items in enumerate(item_groups) for item in items}
+
+    # every chunk returns its failed items and its own tier counts, summed below on this thread
+    def analyze(chunk):
+        tiers = Counter()
+        try:
+            analyze_sentiments_batch(chunk, max_retries=max_retries, raise_on_failure=True, tiers=tiers)
+            return [], tiers
+        except SentimentAnalysisError as e:
+            print(e)
+            groups = list(dict.fromkeys(group_of[id(item)] for item in e.items))
+            if e.retryable or len(groups) < 2:
+                return e.items, tiers
+            # a redelivery would pool the same records into the same failing call, so the records are
+            # tried one at a time and only those that fail on their own are failed;
+            # the retried items are counted again by the retries
+            tiers["failed"] -= len(e.items)
+            failed = []
+            for group in groups:
+                part = [item for item in e.items if group_of[id(item)] == group]
+                try:
+                    analyze_sentiments_batch(part, max_retries=max_retries, raise_on_failure=True, tiers=tiers)
+                except SentimentAnalysisError as part_error:
+                    print(part_error)
+                    failed.extend(part)
+            return failed, tiers
+
+    failed_items = []
+    tiers = Counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BEDROCK_CONCURRENCY) as executor:
+        for failed, chunk_tiers in executor.map(analyze, chunks):
+            failed_items.extend(failed)
+            tiers.update(chunk_tiers)
+    if CASCADE_ENABLED:
+        print(f"Cascade tier hit rates for this call: {tier_hit_rates(tiers)} ({dict(tiers)})")
+
+    failed_ids = {id(item) for item in failed_items}
+    return [i for i, items in enumerate(item_groups) if any(id(item) in failed_ids for item in items)]
 
 
 # generate insight
@@ -202,6 +393,7 @@ def normalize(item, source, keyword=None):
         if isinstance(sentiment, float):
             sentiment = "Positive" if sentiment > 0 else "Negative" if sentiment < 0 else "Neutral"
         item["sentiment"] = sentiment
+        statistics = item.get("statistics")
     elif source == "reddit":
         title = item.get("title", "No Title")
         created_utc = int(item.get("created_utc") or 0)
@@ -214,12 +406,17 @@ def normalize(item, source, keyword=None):
         return None
     if not url:
         return None
-    return {"title": title, "url": url, "created_utc": created_utc, "sentiment": sentiment, "source": source, "keyword": keyword }
+    normalized = {"title": title, "url": url, "created_utc": created_utc, "sentiment": sentiment, "source": source, "keyword": keyword }
+    if source == "youtube" and statistics:
+        normalized["statistics"] = statistics
+    return normalized
 
 # fetch all 
-def fetch_all(keyword=None):
-    reddit = fetch_reddit(query=keyword)
-    youtube = fetch_youtube(query=keyword)
+# cursors: optional {"reddit": {...}, "youtube": {...}} checkpoints for incremental runs, advanced in place
+def fetch_all(keyword=None, cursors=None, priority="interactive"):
+    cursors = cursors or {}
+    reddit = fetch_reddit(query=keyword, cursor=cursors.get("reddit"))
+    youtube = fetch_youtube(query=keyword, cursor=cursors.get("youtube"), priority=priority)
     tweets = fetch_tweets(query=keyword)
     combined_raw = [(r, "reddit") for r in reddit] + [(y, "youtube") for y in youtube] + [(t, "twitter") for t in tweets]
     seen = set()
@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import hashlib
+from botocore.exceptions import ClientError
+
+IN_PROGRESS_TTL = int(os.environ.get("IDEMPOTENCY_IN_PROGRESS_TTL", "900")) # seconds, should cover the Lambda timeout
+DONE_TTL = int(os.environ.get("IDEMPOTENCY_DONE_TTL", str(7 * 24 * 3600))) # seconds a completed record is remembered
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+
+
+class BatchInProgressError(Exception):
+    """Another invocation currently holds the claim for this batch."""
+
+
+# key a batch by its id and a hash of its content, so a reused batch_id with new items is not skipped
+def idempotency_key(batch_id, items):
+    content = json.dumps(items, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{batch_id}#{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+# claim the key with a conditional write; returns None when claimed, or the stored record if it is already done
+def claim(table, key):
+    now = int(time.time())
+    try:
+        table.put_item(
+            Item={"idempotencyKey": key, "status": STATUS_IN_PROGRESS, "expiresAt": now + IN_PROGRESS_TTL},
+            # an expired claim (e.g. from a timed out invocation) can be taken over
+            ConditionExpression="attribute_not_exists(idempotencyKey) OR expiresAt < :now",
+            ExpressionAttributeValues={":now": now}
+        )
+        return None
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    record = table.get_item(Key={"idempotencyKey": key}, ConsistentRead=True).get("Item")
+    if record and record.get("status") == STATUS_DONE:
+        return record
+    raise BatchInProgressError(f"Batch {key} is already being processed")
+
+# mark the key as done and remember where the result was stored
+def complete(table, key, result_key):
+    table.put_item(Item={
+        "idempotencyKey": key,
+        "status": STATUS_DONE,
+        "resultKey": result_key,
+        "expiresAt": int(time.time()) + DONE_TTL
+    })
+
+# give the claim back after a failure so a redelivery can retry right away
+def release(table, key):
+    table.delete_item(
+        Key={"idempotencyKey": key},
+        ConditionExpression="#s = :in_progress",
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues={":in_progress": STATUS_IN_PROGRESS}
+    )
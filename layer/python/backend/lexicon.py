@@ -0,0 +1,148 @@
+import os
+import re
+import sys
+import json
+from collections import Counter
+
+LOCAL_CLASSIFIER_ENABLED = os.environ.get("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+LOCAL_CONFIDENCE_THRESHOLD = float(os.environ.get("LOCAL_CONFIDENCE_THRESHOLD", "0.8")) # below this a post goes to Bedrock
+
+# word weights, tuned for posts about TV shows and movies
+POSITIVE_WORDS = {
+    "love": 2.0, "loved": 2.0, "loving": 1.5, "amazing": 2.0, "awesome": 2.0, "excellent": 2.0, "brilliant": 2.0,
+    "masterpiece": 2.5, "incredible": 2.0, "fantastic": 2.0, "great": 1.5, "good": 1.0, "best": 1.5, "beautiful": 1.5,
+    "enjoyed": 1.5, "enjoy": 1.0, "fun": 1.0, "funny": 1.0, "hilarious": 1.5, "perfect": 2.0, "wonderful": 2.0,
+    "stunning": 2.0, "gorgeous": 1.5, "recommend": 1.5, "favorite": 1.5, "favourite": 1.5, "peak": 1.5,
+    "underrated": 1.0, "binge": 1.0, "bingeworthy": 2.0, "hooked": 1.5, "gripping": 1.5, "epic": 1.5, "thrilling": 1.5,
+    "touching": 1.0, "moving": 1.0, "impressive": 1.5, "solid": 1.0, "cool": 1.0, "like": 0.5, "liked": 1.0,
+    "wow": 1.0, "goat": 1.5, "classic": 1.0, "hype": 1.0, "excited": 1.5, "can't wait": 1.5, "renewed": 1.0,
+}
+NEGATIVE_WORDS = {
+    "hate": -2.0, "hated": -2.0, "awful": -2.0, "terrible": -2.0, "horrible": -2.0, "worst": -2.0, "bad": -1.5,
+    "boring": -2.0, "bored": -1.5, "dull": -1.5, "disappointing": -2.0, "disappointed": -2.0, "disappointment": -2.0,
+    "overrated": -1.5, "mid": -1.0, "cringe": -1.5, "cringy": -1.5, "trash": -2.0, "garbage": -2.0, "waste": -2.0,
+    "mess": -1.5, "ruined": -2.0, "ruin": -1.5, "stupid": -1.5, "annoying": -1.5, "poor": -1.5, "weak": -1.0,
+    "lame": -1.5, "predictable": -1.0, "slow": -0.5, "flop": -2.0, "cancelled": -1.0, "canceled": -1.0,
+    "sucks": -2.0, "sucked": -2.0, "meh": -1.0, "unwatchable": -2.5, "forgettable": -1.5, "lazy": -1.5,
+    "problematic": -1.0, "fail": -1.5, "failed": -1.5, "dislike": -1.5, "skip": -1.0, "angry": -1.5, "sad": -0.5,
+}
+EMOJI_WEIGHTS = {
+    "😍": 2.0, "🥰": 2.0, "❤": 2.0, "💖": 2.0, "💕": 1.5, "😊": 1.5, "😁": 1.5, "😀": 1.0, "😃": 1.0,
+    "🔥": 1.5, "👏": 1.5, "👍": 1.5, "🙌": 1.5, "💯": 1.5, "🤩": 2.0, "🎉": 1.0, "😂": 0.5, "🤣": 0.5,
+    "😡": -2.0, "🤬": -2.0, "😠": -1.5, "👎": -2.0, "💩": -2.0, "🤮": -2.0, "🙄": -1.5, "😒": -1.5,
+    "🥱": -1.5, "😴": -1.5, "😞": -1.5, "😤": -1.0, "💀": 0.0, "😭": 0.0,
+}
+NEGATORS = {"not", "no", "never", "nothing", "hardly", "without", "isn't", "wasn't", "don't", "didn't", "doesn't", "can't", "won't", "ain't", "nor"}
+INTENSIFIERS = {"very": 1.5, "really": 1.3, "so": 1.3, "extremely": 1.8, "super": 1.5, "absolutely": 1.6, "totally": 1.4, "incredibly": 1.7}
+NEGATION_SCOPE = 3 # tokens after a negator whose polarity is flipped
+CONFIDENCE_SCALE = 0.5 # score at which confidence reaches 0.5; one strong word (weight 2) alone reaches 0.8
+
+_WORD_WEIGHTS = {**POSITIVE_WORDS, **NEGATIVE_WORDS}
+_PHRASES = {w: s for w, s in _WORD_WEIGHTS.items() if " " in w}
+_TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?|[\U0001F000-\U0001FAFF☀-➿]|!")
+
+# score every text of a batch at once; returns [(score, confidence)], score > 0 is positive.
+# keywords, one per text, are removed before scoring: show names such as "Breaking Bad" or
+# "The Good Place" would otherwise count as sentiment words
+def score_texts(texts, keywords=None):
+    results = []
+    word_weights, emoji_weights = _WORD_WEIGHTS, EMOJI_WEIGHTS
+    for text, keyword in zip(texts, keywords or [None] * len(texts)):
+        text = str(text or "").lower()
+        if keyword:
+            text = text.replace(str(keyword).strip().lower(), " ")
+        positive = negative = 0.0
+        for phrase, weight in _PHRASES.items():
+            if phrase in text:
+                positive, negative = (positive + weight, negative) if weight > 0 else (positive, negative - weight)
+        negation_left, boost, exclamations = 0, 1.0, 0
+        for token in _TOKEN_PATTERN.findall(text):
+            if token == "!":
+                exclamations += 1
+                continue
+            weight = word_weights.get(token)
+            if weight is None:
+                weight = emoji_weights.get(token)
+                if weight is None:
+                    if token in NEGATORS:
+                        negation_left = NEGATION_SCOPE
+                    elif token in INTENSIFIERS:
+                        boost = INTENSIFIERS[token]
+                        continue
+                    elif negation_left:
+                        negation_left -= 1
+                    boost = 1.0
+                    continue
+            else:
+                weight *= boost
+                if negation_left:
+                    # "not bad" is mildly positive, "not good" is clearly negative
+                    weight = -weight * (0.5 if weight < 0 else 1.0)
+                    negation_left = 0
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+            boost = 1.0
+        score = (positive - negative) * (1 + 0.1 * min(exclamations, 3))
+        results.append((score, _confidence(score, positive, negative)))
+    return results
+
+# confidence grows with the score and shrinks when both polarities are present
+def _confidence(score, positive, negative):
+    if not positive and not negative:
+        return 0.0
+    magnitude = abs(score) / (abs(score) + CONFIDENCE_SCALE)
+    mixed = min(positive, negative) / max(positive, negative)
+    return round(magnitude * (1 - mixed), 3)
+
+# label a batch of items; returns [(label, confidence)], label is None when no polarity was found
+def classify_items(items, text_key="title"):
+    labels = []
+    texts = [item.get(text_key, "") for item in items]
+    for score, confidence in score_texts(texts, [item.get("keyword") for item in items]):
+        label = "Positive" if score > 0 else "Negative" if score < 0 else None
+        labels.append((label, confidence))
+    return labels
+
+# label confident items in place; returns the ambiguous items that still need the LLM
+def prelabel_items(items, threshold=LOCAL_CONFIDENCE_THRESHOLD):
+    ambiguous = []
+    for item, (label, confidence) in zip(items, classify_items(items)):
+        if label and confidence >= threshold:
+            item["sentiment"] = label
+            item["sentiment_source"] = "local"
+        else:
+            ambiguous.append(item)
+    return ambiguous
+
+# compare local labels with LLM labels on a fixed corpus of analyzed items
+def evaluate(items, threshold=LOCAL_CONFIDENCE_THRESHOLD):
+    labelled = [i for i in items if str(i.get("sentiment", "")).capitalize() in ("Positive", "Negative", "Neutral")]
+    covered = correct = 0
+    confusion = Counter()
+    for item, (label, confidence) in zip(labelled, classify_items(labelled)):
+        if label and confidence >= threshold:
+            covered += 1
+            expected = str(item["sentiment"]).capitalize()
+            correct += label == expected
+            confusion[(expected, label)] += 1
+    return {
+        "items": len(labelled),
+        "coverage": round(covered / len(labelled), 3) if labelled else 0,
+        "accuracy": round(correct / covered, 3) if covered else None,
+        "confusion": {f"{e}->{l}": n for (e, l), n in confusion.items()}
+    }
+
+# small hand-labelled set of TV and movie posts, shipped so the evaluation is repeatable
+EVAL_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon_corpus.json")
+
+# python -m backend.lexicon evaluates on the shipped corpus;
+# python -m backend.lexicon analyzed_data/*.json benchmarks against stored Bedrock labels instead
+if __name__ == "__main__":
+    corpus = []
+    for path in sys.argv[1:] or [EVAL_CORPUS_PATH]:
+        with open(path) as f:
+            corpus.extend(json.load(f))
+    for threshold in (0.6, 0.7, 0.8, 0.9):
+        print(threshold, evaluate(corpus, threshold))
@@ -0,0 +1,86 @@
+import os
+import re
+
+# Claude 3 limits on Bedrock
+MODEL_CONTEXT_TOKENS = 200000
+MODEL_MAX_OUTPUT_TOKENS = 4096
+
+MAX_INPUT_TOKENS_PER_CALL = int(os.environ.get("MAX_INPUT_TOKENS_PER_CALL", "6000")) # prompt budget for one call
+MAX_ITEM_TOKENS = int(os.environ.get("MAX_ITEM_TOKENS", "120")) # longer post texts are truncated to this
+PROMPT_OVERHEAD_TOKENS = 120 # system prompt and instructions
+ITEM_OVERHEAD_TOKENS = 4 # "<number>. " and quotes around each post
+OUTPUT_TOKENS_PER_ITEM = 6 # "<number>: <label>" and the newline
+OUTPUT_TOKENS_PER_ITEM_WITH_CONFIDENCE = 10 # "<number>: <label> <confidence>" and the newline
+OUTPUT_HEADROOM_TOKENS = 20 # slack for a stray preamble from the model
+SAFETY_MARGIN = 1.1 # the estimator is approximate, keep some distance from hard limits
+
+# ASCII words and numbers, single CJK/kana/hangul characters, and any other non-space symbol
+# (punctuation, emoji, non-ASCII digits), so every piece but the first two is one character
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|[0-9]+|[぀-ヿ㐀-鿿가-힯]|[^\sA-Za-z0-9]")
+
+# fast offline estimate of the model's token count, no tokenizer download or API call needed
+def estimate_tokens(text):
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece.isascii() and piece.isalnum():
+            # common english words are one token, longer ones split every ~4 characters
+            tokens += 1 + (len(piece) - 1) // 4
+        elif ord(piece) > 0xFFFF:
+            # emoji and other astral symbols usually take a few byte-level tokens
+            tokens += 2
+        else:
+            tokens += 1
+    return tokens
+
+# cut text to about max_tokens estimated tokens, keeping whole words
+def truncate_text(text, max_tokens=MAX_ITEM_TOKENS):
+    text = str(text or "")
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece_tokens = estimate_tokens(match.group())
+        if tokens + piece_tokens > max_tokens:
+            # a single very long word is cut mid-word rather than dropped
+            kept_chars = (max_tokens - tokens) * 4 if match.group().isascii() else 0
+            return text[:match.start() + kept_chars].rstrip() + "…"
+        tokens += piece_tokens
+    return text
+
+# text of an item as it goes into the prompt
+def item_text(item):
+    return truncate_text(item.get("title", ""))
+
+def item_input_tokens(item):
+    return estimate_tokens(item_text(item)) + ITEM_OVERHEAD_TOKENS
+
+def _output_tokens_per_item(with_confidence):
+    return OUTPUT_TOKENS_PER_ITEM_WITH_CONFIDENCE if with_confidence else OUTPUT_TOKENS_PER_ITEM
+
+# max_tokens for a call labelling item_count items
+def output_tokens(item_count, with_confidence=False):
+    per_item = _output_tokens_per_item(with_confidence)
+    return min(MODEL_MAX_OUTPUT_TOKENS, int(per_item * item_count * SAFETY_MARGIN) + OUTPUT_HEADROOM_TOKENS)
+
+# most items one call can hold before its expected answer would exceed the output limit
+def max_items_per_call(with_confidence=False):
+    per_item = _output_tokens_per_item(with_confidence)
+    return int((MODEL_MAX_OUTPUT_TOKENS - OUTPUT_HEADROOM_TOKENS) / (per_item * SAFETY_MARGIN))
+
+# split items into calls as large as the input, output and context budgets allow
+def pack_items(items, max_input_tokens=MAX_INPUT_TOKENS_PER_CALL, with_confidence=False):
+    input_budget = min(max_input_tokens, MODEL_CONTEXT_TOKENS - MODEL_MAX_OUTPUT_TOKENS) / SAFETY_MARGIN - PROMPT_OVERHEAD_TOKENS
+    max_items = max_items_per_call(with_confidence)
+    chunks, chunk, chunk_tokens = [], [], 0
+    for item in items:
+        tokens = item_input_tokens(item)
+        if chunk and (chunk_tokens + tokens > input_budget or len(chunk) >= max_items):
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(item)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
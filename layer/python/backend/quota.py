@@ -0,0 +1,108 @@
+import os
+import time
+import threading
+import datetime
+import boto3
+from botocore.exceptions import ClientError
+
+# YouTube Data API units per call, see https://developers.google.com/youtube/v3/determine_quota_cost
+METHOD_COSTS = {"search.list": 100, "videos.list": 1}
+DAILY_QUOTA = int(os.environ.get("YOUTUBE_DAILY_QUOTA", "10000"))
+# share of the daily quota background refreshes may use, the rest is kept for interactive runs
+BACKGROUND_SHARE = float(os.environ.get("YOUTUBE_BACKGROUND_SHARE", "0.8"))
+QUOTA_TABLE = os.environ.get("YOUTUBE_QUOTA_TABLE")
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+# the quota resets at midnight Pacific time
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TIMEZONE = datetime.timezone(datetime.timedelta(hours=-8))
+
+
+class QuotaExhaustedError(Exception):
+    """The call does not fit in what is left of today's quota for its priority."""
+
+
+def quota_day():
+    return datetime.datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+# units a call of the given priority may bring today's total up to
+def unit_limit(priority, daily_quota=DAILY_QUOTA):
+    if priority == PRIORITY_BACKGROUND:
+        return int(daily_quota * BACKGROUND_SHARE)
+    return daily_quota
+
+
+class DynamoQuota:
+    """Daily unit counter shared by every container, one item per quota day.
+
+    A reservation is a conditional ADD, so concurrent runs can never push the total past the
+    limit of their priority.
+    """
+
+    def __init__(self, table, daily_quota=DAILY_QUOTA):
+        self.table = table
+        self.daily_quota = daily_quota
+
+    def reserve(self, method, priority=PRIORITY_INTERACTIVE, calls=1):
+        units = METHOD_COSTS[method] * calls
+        try:
+            self.table.update_item(
+                Key={"quotaDay": quota_day()},
+                UpdateExpression="ADD usedUnits :units, #m :units SET expiresAt = if_not_exists(expiresAt, :expires)",
+                ConditionExpression="attribute_not_exists(usedUnits) OR usedUnits <= :max_before",
+                ExpressionAttributeNames={"#m": method.replace(".", "_")},
+                ExpressionAttributeValues={
+                    ":units": units,
+                    ":max_before": unit_limit(priority, self.daily_quota) - units,
+                    ":expires": int(time.time()) + 2 * 24 * 3600
+                }
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise QuotaExhaustedError(f"No {priority} quota left for {method}")
+            raise
+        return units
+
+    def used(self):
+        item = self.table.get_item(Key={"quotaDay": quota_day()}, ConsistentRead=True).get("Item") or {}
+        return int(item.get("usedUnits", 0))
+
+
+class LocalQuota:
+    """In-memory counter with the same interface, for tests and single-container use."""
+
+    def __init__(self, daily_quota=DAILY_QUOTA):
+        self.daily_quota = daily_quota
+        self._used = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, method, priority=PRIORITY_INTERACTIVE, calls=1):
+        units = METHOD_COSTS[method] * calls
+        day = quota_day()
+        with self._lock:
+            used = self._used.get(day, 0)
+            if used + units > unit_limit(priority, self.daily_quota):
+                raise QuotaExhaustedError(f"No {priority} quota left for {method}")
+            self._used = {day: used + units}
+        return units
+
+    def used(self):
+        return self._used.get(quota_day(), 0)
+
+
+_scheduler = None
+
+# the DynamoDB counter when YOUTUBE_QUOTA_TABLE is set, otherwise a per-container counter
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        if QUOTA_TABLE:
+            _scheduler = DynamoQuota(boto3.resource("dynamodb").Table(QUOTA_TABLE))
+        else:
+            _scheduler = LocalQuota()
+    return _scheduler
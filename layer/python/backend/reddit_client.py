@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import threading
+import boto3
+import praw
+from concurrent.futures import ThreadPoolExecutor
+from praw.models import ListingGenerator
+
+# optional S3 object (SSE-KMS encrypted) that lets containers share one app-only OAuth token
+REDDIT_TOKEN_CACHE_BUCKET = os.environ.get("REDDIT_TOKEN_CACHE_BUCKET", os.environ.get("S3_BUCKET_NAME"))
+REDDIT_TOKEN_CACHE_KEY = os.environ.get("REDDIT_TOKEN_CACHE_KEY")
+REDDIT_TOKEN_CACHE_KMS_KEY_ID = os.environ.get("REDDIT_TOKEN_CACHE_KMS_KEY_ID")
+TOKEN_MIN_TTL = 60 # seconds; a shared token closer than this to expiry is not reused
+POST_FIELDS = ("title", "score", "url", "created_utc") # all fetch_reddit needs from a submission
+# queries run per keyword: every sort in every subreddit
+REDDIT_SORTS = [s.strip() for s in os.environ.get("REDDIT_SORTS", "hot,new,top").split(",") if s.strip()]
+REDDIT_SUBREDDITS = [s.strip() for s in os.environ.get("REDDIT_SUBREDDITS", "all").split(",") if s.strip()]
+REDDIT_SEARCH_WORKERS = int(os.environ.get("REDDIT_SEARCH_WORKERS", "4"))
+# posts one listing may page through to reach a checkpoint; Reddit serves no more than ~1000 per listing
+REDDIT_CHECKPOINT_LIMIT = int(os.environ.get("REDDIT_CHECKPOINT_LIMIT", "1000"))
+
+s3_client = boto3.client("s3")
+# background page fetches of prefetching listing generators, one in flight per generator
+_prefetch_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("REDDIT_PREFETCH_WORKERS", "4")))
+
+# kept for the life of the container, so warm invocations reuse the token and the HTTP session
+_reddit = None
+_shared_token = None
+
+def _authorizer(reddit):
+    return reddit._read_only_core._authorizer
+
+# the lazily created read-only client, shared by every call in this container
+def get_reddit():
+    global _reddit
+    if _reddit is None:
+        _reddit = praw.Reddit(
+            client_id=os.environ.get("REDDIT_CLIENT_ID"),
+            client_secret=os.environ.get("REDDIT_SECRET"),
+            user_agent="audience-sentiment-agent",
+            check_for_updates=False # skips a PyPI request on every cold start
+        )
+        if REDDIT_TOKEN_CACHE_KEY:
+            _load_shared_token(_reddit)
+    return _reddit
+
+# seed a cold container with a token another container already fetched
+def _load_shared_token(reddit):
+    global _shared_token
+    try:
+        obj = s3_client.get_object(Bucket=REDDIT_TOKEN_CACHE_BUCKET, Key=REDDIT_TOKEN_CACHE_KEY)
+        token = json.loads(obj["Body"].read())
+    except Exception as e:
+        print(f"No shared Reddit token: {e}")
+        return
+    if token["expires_at"] - time.time() < TOKEN_MIN_TTL:
+        return
+    authorizer = _authorizer(reddit)
+    authorizer.access_token = token["access_token"]
+    authorizer._expiration_timestamp = token["expires_at"]
+    authorizer.scopes = set(token["scope"])
+    _shared_token = token["access_token"]
+
+# publish the current token after prawcore fetched a new one
+def share_token(reddit):
+    global _shared_token
+    if not REDDIT_TOKEN_CACHE_KEY:
+        return
+    authorizer = _authorizer(reddit)
+    if not authorizer.is_valid() or authorizer.access_token == _shared_token:
+        return
+    extra = {"SSEKMSKeyId": REDDIT_TOKEN_CACHE_KMS_KEY_ID} if REDDIT_TOKEN_CACHE_KMS_KEY_ID else {}
+    try:
+        s3_client.put_object(
+            Bucket=REDDIT_TOKEN_CACHE_BUCKET,
+            Key=REDDIT_TOKEN_CACHE_KEY,
+            Body=json.dumps({
+                "access_token": authorizer.access_token,
+                "expires_at": authorizer._expiration_timestamp,
+                "scope": sorted(authorizer.scopes or [])
+            }),
+            ContentType="application/json",
+            ServerSideEncryption="aws:kms",
+            **extra
+        )
+        _shared_token = authorizer.access_token
+    except Exception as e:
+        print(f"Failed to share Reddit token: {e}")
+
+
+class RawListingGenerator(ListingGenerator):
+    """ListingGenerator that yields plain dicts of the projected fields.
+
+    Skips praw's objector, so no Submission/Redditor/Subreddit objects are built per post.
+    With ``prefetch`` the next page is requested on a background thread while the current
+    one is consumed. Requests still go one at a time through prawcore's RateLimiter, which
+    sleeps as the rate-limit headers demand, and no page beyond ``limit`` is requested.
+    With ``newer_than`` only posts created after that timestamp are yielded; a listing sorted
+    by new stops at the first older post instead of paging further.
+    """
+
+    def __init__(self, reddit, url, limit=100, params=None, fields=POST_FIELDS, prefetch=False, pacer=None, newer_than=None):
+        super().__init__(reddit, url, limit=limit, params=params)
+        self.fields = fields
+        self.prefetch = prefetch
+        self.pacer = pacer
+        self.newer_than = newer_than
+        self._prefetched = None
+
+    def _fetch_page(self, params):
+        if self.pacer is None:
+            return self._reddit.request(method="GET", path=self.url, params=params)["data"]
+        with self.pacer:
+            return self._reddit.request(method="GET", path=self.url, params=params)["data"]
+
+    def _next_batch(self):
+        if self._exhausted:
+            raise StopIteration
+
+        if self._prefetched is not None:
+            data = self._prefetched.result()
+            self._prefetched = None
+        else:
+            data = self._fetch_page(self.params)
+        children = data["children"]
+        reached_older = False
+        if self.newer_than is not None:
+            newer = [child for child in children if (child["data"].get("created_utc") or 0) > self.newer_than]
+            # newest first: everything after the first older post is older too
+            reached_older = len(newer) < len(children) and self.params.get("sort") == "new"
+            children = newer
+        fields = self.fields
+        self._listing = [{f: child["data"].get(f) for f in fields} for child in children]
+        self._list_index = 0
+
+        if not self._listing:
+            raise StopIteration
+
+        after = data.get("after")
+        if after and after != self.params.get("after") and not reached_older:
+            self.params["after"] = after
+        else:
+            self._exhausted = True
+
+        # request page N+1 now unless this page already reaches the limit
+        remaining = None if self.limit is None else self.limit - self.yielded - len(self._listing)
+        if self.prefetch and not self._exhausted and (remaining is None or remaining > 0):
+            self._prefetched = _prefetch_pool.submit(self._fetch_page, dict(self.params))
+
+# search raw listing dicts instead of Submission objects
+def search_raw(reddit, query, subreddit="all", sort="hot", limit=10, fields=POST_FIELDS, prefetch=True, pacer=None, newer_than=None, **search_kwargs):
+    # let praw build the search url and params, then swap in the raw generator
+    listing = reddit.subreddit(subreddit).search(query=query, sort=sort, limit=limit, **search_kwargs)
+    return RawListingGenerator(
+        reddit, listing.url, limit=limit, params=listing.params, fields=fields, prefetch=prefetch, pacer=pacer, newer_than=newer_than
+    )
+
+
+class RequestPacer:
+    """Spreads the requests of concurrent searches over the remaining rate-limit window.
+
+    prawcore's RateLimiter keeps the x-ratelimit remaining/reset values of the last response
+    but paces one caller at a time. Here every request takes the next free slot, spaced by
+    the time left until reset divided by the requests left (minus those already in flight),
+    so parallel queries use the whole quota without running into 429s.
+    Use as a context manager around each request.
+    """
+
+    def __init__(self, reddit):
+        self._rate_limiter = reddit._core._rate_limiter
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._in_flight = 0
+
+    def __enter__(self):
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot)
+            interval = 0.0
+            # nothing is known before the first response, so the first requests are not spaced
+            remaining = self._rate_limiter.remaining
+            if remaining is not None:
+                reset = self._rate_limiter.reset_timestamp or now
+                budget = remaining - self._in_flight
+                if budget <= 0:
+                    slot = max(slot, reset)
+                else:
+                    interval = max(reset - now, 0) / budget
+            self._next_slot = slot + interval
+            self._in_flight += 1
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        with self._lock:
+            self._in_flight -= 1
+
+# run every sort in every subreddit for one query on a worker pool, merged and deduped by `key`
+def search_many(reddit, query, sorts=None, subreddits=None, limit=10, fields=POST_FIELDS, max_workers=REDDIT_SEARCH_WORKERS, key="url", newer_than=None):
+    if newer_than is not None:
+        # every post newer than the checkpoint is in the "new" listing, the other sorts add nothing;
+        # it is paged until the checkpoint is reached, so no new post is left between the two checkpoints
+        sorts = ["new"]
+        limit = REDDIT_CHECKPOINT_LIMIT
+    queries = [(subreddit, sort) for subreddit in (subreddits or REDDIT_SUBREDDITS) for sort in (sorts or REDDIT_SORTS)]
+    pacer = RequestPacer(reddit)
+
+    def run(subreddit, sort):
+        try:
+            return list(search_raw(reddit, query, subreddit=subreddit, sort=sort, limit=limit, fields=fields, pacer=pacer, newer_than=newer_than))
+        except Exception as e:
+            print(f"Reddit search failed for r/{subreddit} sort={sort}: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda q: run(*q), queries))
+
+    seen = set()
+    posts = []
+    for result in results:
+        for post in result:
+            if post.get(key) not in seen:
+                seen.add(post.get(key))
+                posts.append(post)
+    return posts
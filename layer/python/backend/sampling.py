@@ -0,0 +1,66 @@
+import os
+import math
+import random
+from datetime import datetime
+from collections import defaultdict
+
+SAMPLING_THRESHOLD = int(os.environ.get("SAMPLING_THRESHOLD", "2000")) # runs larger than this are sampled when sampling is on
+SAMPLING_MARGIN = float(os.environ.get("SAMPLING_MARGIN", "0.03")) # target half-width of the 95% interval on a ratio
+Z_95 = 1.96
+LABELS = ("Positive", "Negative", "Neutral")
+
+def _day(item):
+    return datetime.utcfromtimestamp(item.get("created_utc") or 0).strftime("%Y-%m-%d")
+
+# group posts by (source, day)
+def stratify(items):
+    strata = defaultdict(list)
+    for item in items:
+        strata[f"{item.get('source')}|{_day(item)}"].append(item)
+    return strata
+
+# Cochran sample size for a proportion with finite population correction, worst case p = 0.5
+def sample_size(population, margin=SAMPLING_MARGIN, z=Z_95):
+    if population <= 0:
+        return 0
+    n0 = z * z * 0.25 / (margin * margin)
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / population)))
+
+# proportional allocation over strata, at least one post each; every sampled post carries its stratum
+# and the stratum's population so lambda_c can weight the estimates
+def stratified_sample(items, total=None, seed=None):
+    population = len(items)
+    total = total or sample_size(population)
+    rng = random.Random(seed)
+    sample = []
+    for stratum, members in stratify(items).items():
+        take = min(len(members), max(1, round(total * len(members) / population)))
+        for item in rng.sample(members, take):
+            sample.append({**item, "stratum": stratum, "stratum_size": len(members), "sample_weight": len(members) / take})
+    return sample
+
+# stratified estimates of each label ratio (in percent) with 95% confidence intervals
+def estimate_ratios(items, z=Z_95):
+    strata = defaultdict(list)
+    for item in items:
+        strata[item["stratum"]].append(item)
+    sizes = {h: members[0]["stratum_size"] for h, members in strata.items()}
+    population = sum(sizes.values())
+    estimates = {}
+    for label in LABELS:
+        value = variance = 0.0
+        for h, members in strata.items():
+            n, N = len(members), sizes[h]
+            p = sum(1 for x in members if str(x.get("sentiment")).capitalize() == label) / n
+            weight = N / population
+            value += weight * p
+            if n > 1:
+                # finite population correction, a fully sampled stratum adds no error
+                variance += weight * weight * (1 - n / N) * p * (1 - p) / (n - 1)
+        half_width = z * math.sqrt(variance)
+        estimates[label] = {
+            "value": round(value * 100, 2),
+            "low": round(max(0.0, value - half_width) * 100, 2),
+            "high": round(min(1.0, value + half_width) * 100, 2)
+        }
+    return {"ratios": estimates, "population": population, "sampleSize": len(items), "sampleRate": round(len(items) / population, 4) if population else 0}
@@ -0,0 +1,61 @@
+import os
+import json
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+SNSCRAPE_BIN = os.environ.get("SNSCRAPE_BIN", "snscrape")
+SNSCRAPE_TIMEOUT = float(os.environ.get("SNSCRAPE_TIMEOUT", "30")) # seconds one scrape may run before it is killed
+SNSCRAPE_WORKERS = int(os.environ.get("SNSCRAPE_WORKERS", "4")) # snscrape processes running at once
+
+# one thread drives each snscrape process, so this bounds the process count as well
+_scrape_pool = ThreadPoolExecutor(max_workers=SNSCRAPE_WORKERS)
+
+# yield tweets as snscrape prints them, stopping at `limit` tweets or after `timeout` seconds
+def stream_tweets(query, limit=10, timeout=SNSCRAPE_TIMEOUT):
+    # argument list, no shell: the query is passed through verbatim
+    cmd = [SNSCRAPE_BIN, "--jsonl", "--max-results", str(limit), "twitter-search", query]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # killing the process closes its stdout, which ends the loop below
+    deadline = threading.Timer(timeout, proc.kill)
+    deadline.start()
+    count = 0
+    try:
+        for line in proc.stdout:
+            if count >= limit:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                tweet = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipped malformed snscrape line: {line[:100]}")
+                continue
+            count += 1
+            yield tweet
+    finally:
+        deadline.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+
+# scrape several queries in parallel on the bounded pool, merged and deduped by tweet url
+def collect_tweets(queries, limit=10, timeout=SNSCRAPE_TIMEOUT):
+    def run(query):
+        try:
+            return list(stream_tweets(query, limit=limit, timeout=timeout))
+        except Exception as e:
+            print(f"snscrape failed for {query!r}: {e}")
+            return []
+
+    seen = set()
+    tweets = []
+    for result in _scrape_pool.map(run, queries):
+        for tweet in result:
+            key = tweet.get("url") or tweet.get("id")
+            if key not in seen:
+                seen.add(key)
+                tweets.append(tweet)
+    return tweets
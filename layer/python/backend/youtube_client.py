@@ -0,0 +1,224 @@
+import os
+import re
+import sys
+import gzip
+import json
+import threading
+import httplib2
+from cachetools import LRUCache
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build
+from googleapiclient.discovery_cache.base import Cache
+from backend import quota
+
+# optional directory of compact discovery documents ({api}.{version}.json.gz), see __main__ below;
+# with it the layer does not need googleapiclient/discovery_cache/documents
+DISCOVERY_DOC_DIR = os.environ.get("DISCOVERY_DOC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "discovery"))
+
+# search.list costs 100 quota units per page whatever its size, so pages are always full (max 50)
+YOUTUBE_PAGE_SIZE = 50
+YOUTUBE_SEARCH_PAGES = int(os.environ.get("YOUTUBE_SEARCH_PAGES", "1")) # each extra page costs another 100 units
+YOUTUBE_ENRICH_STATISTICS = os.environ.get("YOUTUBE_ENRICH_STATISTICS", "true").lower() == "true"
+VIDEOS_PER_CALL = 50 # max ids per videos.list call
+# only what normalize and the sentiment scoring read
+SEARCH_FIELDS = "nextPageToken,items(id/videoId,snippet(title,publishedAt))"
+STATISTICS_FIELDS = "items(id,statistics(viewCount,likeCount,commentCount))"
+ETAG_CACHE_SIZE = int(os.environ.get("YOUTUBE_ETAG_CACHE_SIZE", "256")) # cached GET responses, 0 disables
+
+# both discovery URI forms googleapiclient requests
+_DISCOVERY_URL_PATTERNS = (
+    re.compile(r"/discovery/v1/apis/(?P<api>[^/]+)/(?P<version>[^/]+)/rest"),
+    re.compile(r"https://(?P<api>[^.]+)\.googleapis\.com/\$discovery/rest\?version=(?P<version>[^&]+)")
+)
+
+
+class DiscoveryCache(Cache):
+    """In-memory discovery cache that keeps parsed documents.
+
+    googleapiclient passes a cached document straight to build_from_document, which only parses
+    strings, so handing back the parsed dict skips reading and parsing the JSON on every build.
+    A miss loads the document from DISCOVERY_DOC_DIR, falling back to the library's static copy.
+    """
+
+    def __init__(self):
+        self._documents = {}
+
+    def get(self, url):
+        document = self._documents.get(url)
+        if document is None:
+            document = self._load(url)
+            if document is not None:
+                self._documents[url] = document
+        return document
+
+    def set(self, url, content):
+        self._documents[url] = json.loads(content) if isinstance(content, (str, bytes)) else content
+
+    def _load(self, url):
+        for pattern in _DISCOVERY_URL_PATTERNS:
+            match = pattern.search(url)
+            if match:
+                return load_document(match.group("api"), match.group("version"))
+        return None
+
+def load_document(api, version):
+    path = os.path.join(DISCOVERY_DOC_DIR, f"{api}.{version}.json.gz")
+    if os.path.exists(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    content = discovery_cache.get_static_doc(api, version)
+    return json.loads(content) if content else None
+
+discovery_doc_cache = DiscoveryCache()
+
+
+class ConditionalHttp:
+    """Wraps an httplib2.Http so repeated GETs are revalidated with their ETag.
+
+    Responses with an ETag are kept per request URL (which carries every query parameter).
+    The next GET of that URL sends If-None-Match and a 304 is answered from the cache,
+    so an unchanged search page costs a round trip without a body.
+    Everything else (POSTs such as batch requests) goes straight to the wrapped object.
+    """
+
+    def __init__(self, http, max_entries=ETAG_CACHE_SIZE):
+        self._http = http
+        self._entries = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET":
+            return self._http.request(uri, method=method, body=body, headers=headers, **kwargs)
+
+        with self._lock:
+            entry = self._entries.get(uri)
+        headers = dict(headers or {})
+        if entry is not None:
+            headers["if-none-match"] = entry[0]
+
+        resp, content = self._http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if resp.status == 304 and entry is not None:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        etag = resp.get("etag")
+        if resp.status == 200 and etag:
+            with self._lock:
+                self._entries[uri] = (etag, resp, content)
+        return resp, content
+
+    # the last good response for a GET of this URL, or None
+    def cached(self, uri):
+        with self._lock:
+            entry = self._entries.get(uri)
+        return (entry[1], entry[2]) if entry is not None else None
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+# kept for the life of the container: the built service, its keep-alive HTTP connection and
+# the ETag cache are reused (googleapiclient already asks for gzip on every request)
+_youtube = None
+
+def get_youtube():
+    global _youtube
+    if _youtube is None:
+        http = httplib2.Http(timeout=20)
+        if ETAG_CACHE_SIZE:
+            http = ConditionalHttp(http)
+        _youtube = build(
+            "youtube", "v3",
+            developerKey=os.environ.get("YOUTUBE_API_KEY"),
+            http=http,
+            cache=discovery_doc_cache,
+            static_discovery=True
+        )
+    return _youtube
+
+# run a request after reserving its quota units; once the budget is used up, the cached
+# response of the same request is served instead, or None if there is none
+def execute_with_quota(youtube, request, method, priority):
+    try:
+        quota.get_scheduler().reserve(method, priority=priority)
+    except quota.QuotaExhaustedError as e:
+        cached = getattr(youtube._http, "cached", None)
+        response = cached(request.uri) if cached else None
+        print(f"{e}, {'serving cached response' if response else 'no cached response'}")
+        return request.postproc(*response) if response else None
+    return request.execute()
+
+# page through search results up to `pages` deep; returns the videos and the token of the next page
+def search_videos(query, pages=YOUTUBE_SEARCH_PAGES, page_token=None, priority=quota.PRIORITY_INTERACTIVE, **params):
+    youtube = get_youtube()
+    items = []
+    for _ in range(pages):
+        request = youtube.search().list(
+            q=query,
+            part="snippet",
+            type="video",
+            maxResults=YOUTUBE_PAGE_SIZE,
+            fields=SEARCH_FIELDS,
+            pageToken=page_token,
+            **params
+        )
+        response = execute_with_quota(youtube, request, "search.list", priority)
+        if response is None:
+            break
+        items.extend(response.get("items", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return items, page_token
+
+# add view/like/comment counts to search results, 50 ids per videos.list call, all calls in one batch request
+def enrich_statistics(items, priority=quota.PRIORITY_INTERACTIVE):
+    youtube = get_youtube()
+    video_ids = [item["id"]["videoId"] for item in items if item.get("id", {}).get("videoId")]
+    requests = [
+        youtube.videos().list(part="statistics", id=",".join(video_ids[i:i + VIDEOS_PER_CALL]), fields=STATISTICS_FIELDS)
+        for i in range(0, len(video_ids), VIDEOS_PER_CALL)
+    ]
+    statistics = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            print(f"Failed to fetch video statistics: {exception}")
+            return
+        for video in response.get("items", []):
+            statistics[video["id"]] = {k: int(v) for k, v in video.get("statistics", {}).items()}
+
+    if len(requests) == 1:
+        response = execute_with_quota(youtube, requests[0], "videos.list", priority)
+        if response is not None:
+            collect(None, response, None)
+    elif requests:
+        # batch parts are POSTed together and never cached, so without quota they are skipped
+        try:
+            quota.get_scheduler().reserve("videos.list", priority=priority, calls=len(requests))
+        except quota.QuotaExhaustedError as e:
+            print(f"{e}, statistics skipped")
+            return items
+        batch = youtube.new_batch_http_request(callback=collect)
+        for request in requests:
+            batch.add(request)
+        batch.execute()
+
+    for item in items:
+        stats = statistics.get(item.get("id", {}).get("videoId"))
+        if stats:
+            item["statistics"] = stats
+    return items
+
+# write minified, gzipped copies of the given discovery documents, e.g. youtube.v3
+if __name__ == "__main__":
+    out_dir = sys.argv[1]
+    os.makedirs(out_dir, exist_ok=True)
+    for name in sys.argv[2:]:
+        api, version = name.split(".", 1)
+        document = json.loads(discovery_cache.get_static_doc(api, version))
+        with gzip.open(os.path.join(out_dir, f"{name}.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+        print(name, os.path.getsize(os.path.join(out_dir, f"{name}.json.gz")), "bytes")
@@ -11,6 +11,10 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +32,7 @@ class TableResource:
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def batch_writer(self, overwrite_by_pkeys=None):
+    def batch_writer(self, overwrite_by_pkeys=None, max_concurrency=None):
         """Create a batch writer object.
 
         This method creates a context manager for writing
@@ -54,7 +58,19 @@ class TableResource:
             if match new request item on specified primary keys. i.e
             ``["partition_key1", "sort_key2", "sort_key3"]``
 
+        :type max_concurrency: int
+        :param max_concurrency: If set, batches are flushed on a background
+            thread pool with up to this many ``batch_write_item`` requests
+            in flight. See :py:class:`ParallelBatchWriter`.
+
         """
+        if max_concurrency:
+            return ParallelBatchWriter(
+                self.name,
+                self.meta.client,
+                overwrite_by_pkeys=overwrite_by_pkeys,
+                max_concurrency=max_concurrency,
+            )
         return BatchWriter(
             self.name, self.meta.client, overwrite_by_pkeys=overwrite_by_pkeys
         )
@@ -165,3 +181,175 @@ class BatchWriter:
         # until there's nothing left in our items buffer.
         while self._items_buffer:
             self._flush()
+
+
+class ParallelBatchWriter(BatchWriter):
+    """Batch writer that flushes on a background thread pool.
+
+    Full batches are handed to a pool of worker threads so several
+    ``batch_write_item`` requests can be in flight at once. Unprocessed
+    items are retried by the worker that sent them, with jittered
+    exponential backoff. At most ``max_pending_batches`` batches may be
+    queued or in flight; once that limit is reached ``put_item`` and
+    ``delete_item`` block until a batch completes, which bounds memory.
+    Leaving the context manager sends whatever is left in the buffer and
+    waits for every outstanding request to finish.
+
+    Batches may complete in any order. With ``overwrite_by_pkeys`` a batch
+    is held back until every in-flight batch sharing one of its keys has
+    completed, so requests for the same key are still applied in the order
+    they were made. Without it the writer cannot tell which requests share
+    a key, and a put and a later delete of the same item that fall into
+    different batches may be applied in either order.
+    """
+
+    def __init__(
+        self,
+        table_name,
+        client,
+        flush_amount=25,
+        overwrite_by_pkeys=None,
+        max_concurrency=4,
+        max_pending_batches=None,
+        base_backoff=0.05,
+        max_backoff=5.0,
+    ):
+        """
+
+        :type max_concurrency: int
+        :param max_concurrency: The number of worker threads sending
+            ``batch_write_item`` requests.
+
+        :type max_pending_batches: int
+        :param max_pending_batches: The number of batches allowed to be
+            queued or in flight before writes block. Defaults to twice
+            ``max_concurrency``.
+
+        :type base_backoff: float
+        :param base_backoff: The backoff, in seconds, before the first
+            retry of unprocessed items.
+
+        :type max_backoff: float
+        :param max_backoff: The upper bound, in seconds, of the backoff
+            between retries of unprocessed items.
+
+        See :py:class:`BatchWriter` for the remaining parameters.
+        """
+        super().__init__(
+            table_name,
+            client,
+            flush_amount=flush_amount,
+            overwrite_by_pkeys=overwrite_by_pkeys,
+        )
+        if max_pending_batches is None:
+            max_pending_batches = max_concurrency * 2
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._pending = threading.BoundedSemaphore(max_pending_batches)
+        self._futures = set()
+        self._batch_keys = {}
+        self._futures_lock = threading.Lock()
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._exception = None
+
+    def _add_request_and_process(self, request):
+        self._raise_if_failed()
+        super()._add_request_and_process(request)
+
+    def _flush(self):
+        items_to_send = self._items_buffer[: self._flush_amount]
+        self._items_buffer = self._items_buffer[self._flush_amount :]
+        keys = self._batch_key_set(items_to_send)
+        if keys:
+            self._wait_for_conflicts(keys)
+        # Blocks when too many batches are outstanding (backpressure).
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(self._send_batch, items_to_send)
+        except BaseException:
+            self._pending.release()
+            raise
+        with self._futures_lock:
+            self._futures.add(future)
+            if keys:
+                self._batch_keys[future] = keys
+        future.add_done_callback(self._on_batch_done)
+
+    def _batch_key_set(self, items):
+        if not self._overwrite_by_pkeys:
+            return None
+        # Key values may be unhashable (e.g. Binary), so compare their reprs.
+        return {repr(self._extract_pkey_values(item)) for item in items}
+
+    def _wait_for_conflicts(self, keys):
+        with self._futures_lock:
+            conflicting = [
+                future
+                for future, batch_keys in self._batch_keys.items()
+                if not keys.isdisjoint(batch_keys)
+            ]
+        if conflicting:
+            logger.debug(
+                "Waiting for %s in-flight batches with the same keys",
+                len(conflicting),
+            )
+            wait(conflicting)
+
+    def _on_batch_done(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+            self._batch_keys.pop(future, None)
+        self._pending.release()
+        self._record_exception(future)
+
+    def _record_exception(self, future):
+        exception = future.exception()
+        if exception is not None and self._exception is None:
+            self._exception = exception
+
+    def _send_batch(self, items_to_send):
+        attempt = 0
+        while items_to_send:
+            if attempt:
+                time.sleep(self._get_backoff(attempt))
+            response = self._client.batch_write_item(
+                RequestItems={self._table_name: items_to_send}
+            )
+            unprocessed_items = response['UnprocessedItems'] or {}
+            items_to_send = unprocessed_items.get(self._table_name, [])
+            attempt += 1
+            logger.debug(
+                "Batch write attempt %s, unprocessed: %s",
+                attempt,
+                len(items_to_send),
+            )
+
+    def _get_backoff(self, attempt):
+        # Full jitter: a random delay up to the capped exponential backoff.
+        cap = min(self._max_backoff, self._base_backoff * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    def _wait_for_pending(self):
+        # Only the calling thread submits batches, so nothing new can be
+        # queued while we wait.
+        with self._futures_lock:
+            futures = list(self._futures)
+        wait(futures)
+        for future in futures:
+            self._record_exception(future)
+
+    def _raise_if_failed(self):
+        if self._exception is not None:
+            raise self._exception
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # Send whatever is left in the buffer, then wait for every
+        # outstanding batch before returning.
+        try:
+            while self._items_buffer and self._exception is None:
+                self._flush()
+            self._wait_for_pending()
+        finally:
+            self._executor.shutdown(wait=True)
+        if exc_type is None:
+            self._raise_if_failed()
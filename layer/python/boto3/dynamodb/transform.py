@@ -15,7 +15,10 @@ import copy
 from boto3.compat import collections_abc
 from boto3.docs.utils import DocumentModifiedShape
 from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
-from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from boto3.dynamodb.types import (
+    BulkTypeDeserializer,
+    TypeSerializer,
+)
 
 
 def register_high_level_interface(base_classes, **kwargs):
@@ -160,7 +163,7 @@ class TransformationInjector:
 
         self._deserializer = deserializer
         if deserializer is None:
-            self._deserializer = TypeDeserializer()
+            self._deserializer = BulkTypeDeserializer()
 
     def inject_condition_expressions(self, params, model, **kwargs):
         """Injects the condition expression transformation into the parameters
@@ -224,12 +227,37 @@ class TransformationInjector:
     def inject_attribute_value_output(self, parsed, model, **kwargs):
         """Injects DynamoDB deserialization into responses"""
         if model.output_shape is not None:
+            items = self._pop_bulk_items(parsed, model.output_shape)
             self._transformer.transform(
                 parsed,
                 model.output_shape,
                 self._deserializer.deserialize,
                 'AttributeValue',
             )
+            if items is not None:
+                parsed['Items'] = self._deserializer.deserialize_items(items)
+
+    def _pop_bulk_items(self, parsed, output_shape):
+        # Pages of items returned by scan and query (``Items`` as a list of
+        # attribute maps) are handed to the bulk deserializer in one go
+        # rather than walked value by value.
+        if not isinstance(self._deserializer, BulkTypeDeserializer):
+            return None
+        items_shape = output_shape.members.get('Items')
+        if items_shape is None or items_shape.type_name != 'list':
+            return None
+        item_shape = items_shape.member
+        if (
+            item_shape.type_name != 'map'
+            or item_shape.value.name != 'AttributeValue'
+        ):
+            return None
+        items = parsed.get('Items')
+        if not isinstance(items, collections_abc.MutableSequence):
+            return None
+        # Leave an empty list in place so the key order is preserved.
+        parsed['Items'] = []
+        return items
 
 
 class ConditionExpressionTransformation:
@@ -308,3 +308,101 @@ class TypeDeserializer:
 
     def _deserialize_m(self, value):
         return {k: self.deserialize(v) for k, v in value.items()}
+
+
+class BulkTypeDeserializer(TypeDeserializer):
+    """Deserializes whole pages of DynamoDB items using cached plans.
+
+    Items returned by a scan or query of a single table almost always
+    share the same attribute names and types. Instead of dispatching on
+    the type of every attribute of every item, this class compiles a
+    decoding function the first time it sees a given set of attribute
+    names and reuses it for every following item with the same names.
+    Items whose attribute types differ from the compiled plan fall back
+    to :py:meth:`TypeDeserializer.deserialize`.
+
+    It can be used directly on the ``Items`` of a low-level client
+    response::
+
+        deserializer = BulkTypeDeserializer()
+        items = deserializer.deserialize_items(response['Items'])
+    """
+
+    # Expressions used by a compiled plan to decode each DynamoDB type.
+    # Nested lists and maps still go through the recursive deserializer.
+    _INLINE_EXPRESSIONS = {
+        NULL: '_null({value})',
+        BOOLEAN: '{value}',
+        NUMBER: '_number({value})',
+        STRING: '{value}',
+        BINARY: '_binary({value})',
+        NUMBER_SET: 'set(map(_number, {value}))',
+        STRING_SET: 'set({value})',
+        BINARY_SET: 'set(map(_binary, {value}))',
+        LIST: '_list({value})',
+        MAP: '_map({value})',
+    }
+
+    def __init__(self, max_plans=128):
+        self._max_plans = max_plans
+        self._plans = {}
+
+    def deserialize_items(self, items):
+        """Deserializes a list of DynamoDB items.
+
+        :param items: A list of items, each a dictionary mapping attribute
+            names to DynamoDB values, as returned in ``Items`` by a
+            low-level ``scan`` or ``query`` call.
+
+        :returns: A list of dictionaries of pythonic values.
+        """
+        return [self.deserialize_item(item) for item in items]
+
+    def deserialize_item(self, item):
+        """Deserializes a single DynamoDB item.
+
+        :param item: A dictionary mapping attribute names to DynamoDB values.
+
+        :returns: A dictionary of pythonic values.
+        """
+        names = tuple(item)
+        plan = self._plans.get(names)
+        if plan is None:
+            plan = self._compile_plan(item)
+            if len(self._plans) >= self._max_plans:
+                self._plans.clear()
+            self._plans[names] = plan
+        try:
+            return plan(item)
+        except (KeyError, TypeError):
+            # The item has the same attribute names as the one the plan
+            # was compiled from, but not the same types.
+            return self._deserialize_m(item)
+
+    def _compile_plan(self, item):
+        entries = []
+        for name, value in item.items():
+            if not isinstance(value, collections_abc.Mapping) or not value:
+                # Let the generic deserializer raise the usual error.
+                expression = '_generic(item[{name!r}])'
+            else:
+                dynamodb_type = next(iter(value))
+                template = self._INLINE_EXPRESSIONS.get(dynamodb_type)
+                if template is None:
+                    expression = '_generic(item[{name!r}])'
+                else:
+                    expression = template.format(
+                        value=f'item[{{name!r}}][{dynamodb_type!r}]'
+                    )
+            entries.append(f'{name!r}: ' + expression.format(name=name))
+        source = 'def plan(item):\n    return {%s}\n' % ', '.join(entries)
+        namespace = {
+            '_null': self._deserialize_null,
+            '_number': DYNAMODB_CONTEXT.create_decimal,
+            '_binary': Binary,
+            '_list': self._deserialize_l,
+            '_map': self._deserialize_m,
+            '_generic': self.deserialize,
+        }
+        exec(source, namespace)
+        return namespace['plan']
@@ -18,7 +18,9 @@ import functools
 import hmac
 import json
 import logging
+import threading
 import time
+from collections import OrderedDict
 from collections.abc import Mapping
 from email.utils import formatdate
 from hashlib import sha1, sha256
@@ -69,6 +71,10 @@ SIGNED_HEADERS_BLACKLIST = [
 ]
 UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
 STREAMING_UNSIGNED_PAYLOAD_TRAILER = 'STREAMING-UNSIGNED-PAYLOAD-TRAILER'
+# Upper bound on the number of derived SigV4 signing keys kept in memory.
+# One key is needed per (credentials, date, region, service) combination,
+# so this comfortably covers a process talking to many services at once.
+SIGNING_KEY_CACHE_SIZE = 64
 
 
 def _host_from_url(url):
@@ -103,6 +109,70 @@ def _get_body_as_dict(request):
     return data
 
 
+class SigningKeyCache:
+    """Bounded LRU cache of derived SigV4 signing keys.
+
+    Deriving a signing key takes four chained HMAC operations, but the
+    result only changes when the secret key, the date, the region or the
+    service changes.  Entries are keyed by a hash of the secret key so the
+    plaintext secret is never used as a dictionary key.  When the secret
+    key associated with an access key changes (i.e. the credentials were
+    rotated), every key derived from the previous secret is dropped.
+    """
+
+    def __init__(self, max_size=SIGNING_KEY_CACHE_SIZE):
+        self._max_size = max_size
+        self._keys = OrderedDict()
+        self._secret_hashes = {}
+        self._lock = threading.Lock()
+
+    def get_signing_key(self, credentials, date, region_name, service_name):
+        secret_hash = sha256(credentials.secret_key.encode('utf-8')).digest()
+        cache_key = (secret_hash, date, region_name, service_name)
+        with self._lock:
+            signing_key = self._keys.get(cache_key)
+            if signing_key is not None:
+                self._keys.move_to_end(cache_key)
+                return signing_key
+        signing_key = self._derive(
+            credentials.secret_key, date, region_name, service_name
+        )
+        with self._lock:
+            previous_hash = self._secret_hashes.get(credentials.access_key)
+            if previous_hash is not None and previous_hash != secret_hash:
+                self._invalidate(previous_hash)
+            self._secret_hashes[credentials.access_key] = secret_hash
+            self._keys[cache_key] = signing_key
+            while len(self._keys) > self._max_size:
+                self._keys.popitem(last=False)
+        return signing_key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._secret_hashes.clear()
+
+    def _invalidate(self, secret_hash):
+        for cache_key in [k for k in self._keys if k[0] == secret_hash]:
+            del self._keys[cache_key]
+
+    def _derive(self, secret_key, date, region_name, service_name):
+        k_date = _hmac_digest(f"AWS4{secret_key}".encode(), date)
+        k_region = _hmac_digest(k_date, region_name)
+        k_service = _hmac_digest(k_region, service_name)
+        return _hmac_digest(k_service, 'aws4_request')
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _hmac_digest(key, msg):
+    return hmac.new(key, msg.encode('utf-8'), sha256).digest()
+
+
+_SIGNING_KEY_CACHE = SigningKeyCache()
+
+
 class BaseSigner:
     REQUIRES_REGION = False
     REQUIRES_TOKEN = False
@@ -408,13 +478,14 @@ class SigV4Auth(BaseSigner):
         return '\n'.join(sts)
 
     def signature(self, string_to_sign, request):
-        key = self.credentials.secret_key
-        k_date = self._sign(
-            (f"AWS4{key}").encode(), request.context["timestamp"][0:8]
+        # A new signer is created for every request, so the derived
+        # signing key is cached at module level rather than on the instance.
+        k_signing = _SIGNING_KEY_CACHE.get_signing_key(
+            self.credentials,
+            request.context["timestamp"][0:8],
+            self._region_name,
+            self._service_name,
         )
-        k_region = self._sign(k_date, self._region_name)
-        k_service = self._sign(k_region, self._service_name)
-        k_signing = self._sign(k_service, 'aws4_request')
         return self._sign(k_signing, string_to_sign, hex=True)
 
     def add_auth(self, request):
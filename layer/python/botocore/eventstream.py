@@ -13,7 +13,7 @@
 """Binary Event Stream Decoding"""
 
 from binascii import crc32
-from struct import unpack
+from struct import unpack, unpack_from
 
 from botocore.exceptions import EventStreamError
 
@@ -440,10 +440,20 @@ class EventStreamBuffer:
 
     A buffer class that wraps bytes from an event stream providing parsed
     messages as they become available via an iterable interface.
+
+    Messages are decoded from ``self._data`` at ``self._offset`` rather than
+    by re-slicing the buffer after each one, and added chunks are only
+    joined onto it once they complete the prelude or message being waited
+    for. A large message arriving in many small chunks is therefore joined
+    once instead of being copied on every chunk, and decoding a stream is
+    linear in its size rather than quadratic.
     """
 
     def __init__(self):
         self._data = b''
+        self._offset = 0
+        self._pending = []
+        self._pending_length = 0
         self._prelude = None
         self._header_parser = EventStreamHeaderParser()
 
@@ -453,7 +463,19 @@ class EventStreamBuffer:
         :type data: bytes
         :param data: The bytes to add to the buffer to be used when parsing
         """
-        self._data += data
+        self._pending.append(data)
+        self._pending_length += len(data)
+
+    def _join_pending(self, length):
+        # Called when fewer than ``length`` bytes are past the offset; joins
+        # the pending chunks only if together they provide enough bytes.
+        if len(self._data) - self._offset + self._pending_length < length:
+            return False
+        self._data = b''.join([self._data[self._offset :], *self._pending])
+        self._offset = 0
+        self._pending = []
+        self._pending_length = 0
+        return True
 
     def _validate_prelude(self, prelude):
         if prelude.headers_length > _MAX_HEADERS_LENGTH:
@@ -463,33 +485,45 @@ class EventStreamBuffer:
             raise InvalidPayloadLength(prelude.payload_length)
 
     def _parse_prelude(self):
-        prelude_bytes = self._data[:_PRELUDE_LENGTH]
-        raw_prelude, _ = DecodeUtils.unpack_prelude(prelude_bytes)
+        offset = self._offset
+        raw_prelude = unpack_from(
+            DecodeUtils.PRELUDE_BYTE_FORMAT, self._data, offset
+        )
         prelude = MessagePrelude(*raw_prelude)
         # The minus 4 removes the prelude crc from the bytes to be checked
-        _validate_checksum(prelude_bytes[: _PRELUDE_LENGTH - 4], prelude.crc)
+        prelude_bytes = self._data[offset : offset + _PRELUDE_LENGTH - 4]
+        _validate_checksum(prelude_bytes, prelude.crc)
         self._validate_prelude(prelude)
         return prelude
 
     def _parse_headers(self):
-        header_bytes = self._data[_PRELUDE_LENGTH : self._prelude.headers_end]
+        offset = self._offset
+        header_bytes = self._data[
+            offset + _PRELUDE_LENGTH : offset + self._prelude.headers_end
+        ]
         return self._header_parser.parse(header_bytes)
 
     def _parse_payload(self):
+        offset = self._offset
         prelude = self._prelude
-        payload_bytes = self._data[prelude.headers_end : prelude.payload_end]
+        payload_bytes = self._data[
+            offset + prelude.headers_end : offset + prelude.payload_end
+        ]
         return payload_bytes
 
     def _parse_message_crc(self):
-        prelude = self._prelude
-        crc_bytes = self._data[prelude.payload_end : prelude.total_length]
-        message_crc, _ = DecodeUtils.unpack_uint32(crc_bytes)
+        message_crc = unpack_from(
+            DecodeUtils.UINT32_BYTE_FORMAT,
+            self._data,
+            self._offset + self._prelude.payload_end,
+        )[0]
         return message_crc
 
     def _parse_message_bytes(self):
+        offset = self._offset
         # The minus 4 includes the prelude crc to the bytes to be checked
         message_bytes = self._data[
-            _PRELUDE_LENGTH - 4 : self._prelude.payload_end
+            offset + _PRELUDE_LENGTH - 4 : offset + self._prelude.payload_end
         ]
         return message_bytes
 
@@ -508,8 +542,8 @@ class EventStreamBuffer:
         return message
 
     def _prepare_for_next_message(self):
-        # Advance the data and reset the current prelude
-        self._data = self._data[self._prelude.total_length :]
+        # Advance the offset and reset the current prelude
+        self._offset += self._prelude.total_length
         self._prelude = None
 
     def next(self):
@@ -518,13 +552,16 @@ class EventStreamBuffer:
         :rtype: EventStreamMessage
         :returns: The next event stream message
         """
-        if len(self._data) < _PRELUDE_LENGTH:
-            raise StopIteration()
-
+        available = len(self._data) - self._offset
         if self._prelude is None:
+            if available < _PRELUDE_LENGTH:
+                if not self._join_pending(_PRELUDE_LENGTH):
+                    raise StopIteration()
+                available = len(self._data)
             self._prelude = self._parse_prelude()
 
-        if len(self._data) < self._prelude.total_length:
+        total_length = self._prelude.total_length
+        if available < total_length and not self._join_pending(total_length):
             raise StopIteration()
 
         return self._parse_message()